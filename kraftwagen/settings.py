@@ -41,7 +41,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'showroom.metrics.MetricsMiddleware',
+    'showroom.querycount.QueryBudgetMiddleware',
+    'showroom.slowqueries.SlowQueryMiddleware',
+    'showroom.advisor.FilterTrafficMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'showroom.routers.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,7 +59,7 @@ ROOT_URLCONF = 'kraftwagen.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'showroom.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,10 +86,41 @@ DATABASES = {
         'USER': 'kraftfahrer',
         'HOST': 'localhost',
         'PASSWORD': '11235813'
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': 'showroom',
+        'USER': 'kraftfahrer',
+        'HOST': 'localhost',
+        'PASSWORD': '11235813',
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['showroom.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Local memory is per process; production should point this at a shared
+# file or Redis-compatible backend so that every worker sees the same entries.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
 
+# Sessions and authentication are served from the cache, see showroom.sessions and showroom.backends
+
+SESSION_ENGINE = 'showroom.sessions'
+
+AUTHENTICATION_BACKENDS = ['showroom.backends.CachedModelBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -122,3 +158,100 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Showroom
+# Per-URL-name query budgets checked by showroom.querycount.QueryBudgetMiddleware
+
+SHOWROOM_QUERY_BUDGETS = {
+    'cars': 6,
+    'search': 6,
+    'orders': 8,
+    'employees': 4,
+    'sales': 4,
+}
+
+# When strict, a page over its budget or repeating a query shape raises
+# QueryBudgetExceeded, a 500, so following DEBUG any overrun fails the request
+# in development. Otherwise overruns are only logged. The budgets are pinned by
+# tests/test_query_budgets.py.
+
+SHOWROOM_QUERY_BUDGET_STRICT = DEBUG
+
+SHOWROOM_N_PLUS_ONE_THRESHOLD = 3
+
+# Cache alias used for query results and their generation counters
+
+SHOWROOM_CACHE = 'default'
+
+# Read replicas used by showroom.routers for the URL names below, and how long
+# a client that wrote keeps reading from the primary
+
+SHOWROOM_READ_REPLICAS = ['replica']
+
+SHOWROOM_REPLICA_URLS = [
+    'cars', 'search', 'orders', 'employees', 'sales',
+    'api-cars', 'api-car-facets', 'api-orders', 'api-employees',
+]
+
+SHOWROOM_PRIMARY_STICKY_SECONDS = 10
+
+# Fraction of requests measured by showroom.metrics.MetricsMiddleware, and the
+# addresses allowed to scrape the /metrics endpoint
+
+SHOWROOM_METRICS_SAMPLE_RATE = 1.0
+
+SHOWROOM_METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Queries slower than this are logged with their EXPLAIN plan by
+# showroom.slowqueries.SlowQueryMiddleware, see `manage.py slowqueries`
+
+SHOWROOM_SLOW_QUERY_SECONDS = 0.5
+
+SHOWROOM_SLOW_QUERY_LOG = BASE_DIR / 'slowqueries.log'
+
+# Fraction of requests whose filter shapes are logged for `manage.py adviseindexes`
+
+SHOWROOM_FILTER_SAMPLE_RATE = 0.05
+
+SHOWROOM_FILTER_LOG = BASE_DIR / 'filtertraffic.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'slowqueries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SHOWROOM_SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+        'filtertraffic': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SHOWROOM_FILTER_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'showroom.slowqueries': {
+            'handlers': ['slowqueries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'showroom.advisor': {
+            'handlers': ['filtertraffic'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,27 @@
+"""
+Settings for running kraftwagen without MySQL: two SQLite files stand in for
+the primary and its read replica.
+
+    python manage.py migrate --settings=kraftwagen.settings_sqlite
+    cp db.sqlite3 replica.sqlite3
+    python manage.py runserver --settings=kraftwagen.settings_sqlite
+    python manage.py test --settings=kraftwagen.settings_sqlite
+
+Nothing replicates between the files: the replica stays as of its last copy,
+like one lagging behind, so the list pages show what it holds while a client
+that just wrote is kept on the primary. Under test each alias gets its own
+in-memory database.
+"""
+from kraftwagen.settings import *  # noqa: F401,F403
+from kraftwagen.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
+}
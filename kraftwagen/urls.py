@@ -16,7 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from showroom import metrics
+
 urlpatterns = [
     path('showroom/', include('showroom.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics.export, name='metrics'),
 ]
@@ -1,14 +1,163 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-from showroom.models import Employee, Position, Fullname, Facility, BodyType, Car, Order, Manufacturer
+from showroom.models import (
+    ArchivedOrder, Employee, Position, Fullname, Facility, BodyType, Car, CarFacility, Order, Manufacturer,
+)
+from showroom.utils import ADMIN_EXACT_COUNT_MAX, ADMIN_LIST_PER_PAGE
 
-admin.site.register(Position)
-admin.site.register(Employee)
-admin.site.register(Fullname)
+ESTIMATES = {
+    'mysql': 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+}
 
-admin.site.register(Manufacturer)
-admin.site.register(Facility)
-admin.site.register(BodyType)
-admin.site.register(Car)
 
-admin.site.register(Order)
+def estimated_rows(model, using):
+    """Returns the table statistics' row estimate, or None where the backend keeps none."""
+    connection = connections[using]
+    if connection.vendor not in ESTIMATES:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(ESTIMATES[connection.vendor], [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts unfiltered changelists of large tables from table statistics,
+    since an exact COUNT(*) on InnoDB scans a whole index. Filtered and
+    small lists are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > ADMIN_EXACT_COUNT_MAX:
+                return estimate
+        return super().count
+
+
+class ShowroomAdmin(admin.ModelAdmin):
+    """
+    Base admin for the large tables. A search term made of digits only is
+    matched exactly against `number_search_fields` instead of running
+    text lookups on every search field.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = ADMIN_LIST_PER_PAGE
+    ordering = ('-id',)
+    list_select_related = ()
+    number_search_fields = ('id',)
+
+    def get_queryset(self, request):
+        # Autocomplete results render __str__ as well, so every queryset gets the changelist's joins.
+        queryset = super().get_queryset(request)
+        if self.list_select_related:
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.isdigit() and len(term) < 19:
+            match = Q()
+            for field in self.number_search_fields:
+                match |= Q(**{field: int(term)})
+            return queryset.filter(match), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(Position)
+class PositionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'salary')
+
+
+@admin.register(Fullname)
+class FullnameAdmin(ShowroomAdmin):
+    list_display = ('id', 'surname', 'first_name', 'second_name')
+    search_fields = ('^surname', '^first_name')
+
+
+@admin.register(Employee)
+class EmployeeAdmin(ShowroomAdmin):
+    list_display = ('id', 'fullname', 'position', 'age', 'sex')
+    list_select_related = ('fullname', 'position')
+    list_filter = ('position', 'sex')
+    search_fields = ('^fullname__surname',)
+    number_search_fields = ('id', 'passport')
+    raw_id_fields = ('fullname',)
+
+
+@admin.register(Manufacturer)
+class ManufacturerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'country', 'employee')
+    list_select_related = ('employee__fullname', 'employee__position')
+    list_filter = ('country',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('employee',)
+
+
+@admin.register(Facility)
+class FacilityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'price')
+    search_fields = ('^name',)
+
+
+@admin.register(BodyType)
+class BodyTypeAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+
+
+class CarFacilityInline(admin.TabularInline):
+    model = CarFacility
+    extra = 0
+    autocomplete_fields = ('facility',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('facility', 'car__manufacturer')
+
+
+@admin.register(Car)
+class CarAdmin(ShowroomAdmin):
+    list_display = ('id', 'brand', 'manufacturer', 'body_type', 'color', 'price', 'date_produced', 'state')
+    list_select_related = ('manufacturer', 'body_type')
+    list_filter = ('state', 'body_type', 'manufacturer__country')
+    search_fields = ('^brand', '^manufacturer__name')
+    number_search_fields = ('id', 'body_number', 'engine_number')
+    autocomplete_fields = ('manufacturer', 'employee')
+    readonly_fields = Car.PLACEMENT_FIELDS
+    inlines = (CarFacilityInline,)
+
+
+@admin.register(Order)
+class OrderAdmin(ShowroomAdmin):
+    list_display = ('id', 'fullname', 'car', 'employee', 'date_ordered', 'is_paid', 'is_processed')
+    list_select_related = ('fullname', 'car__manufacturer', 'employee__fullname', 'employee__position')
+    list_filter = ('is_paid', 'date_ordered')
+    search_fields = ('^fullname__surname',)
+    autocomplete_fields = ('car', 'employee')
+    raw_id_fields = ('fullname',)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ShowroomAdmin):
+    list_display = ('id', 'fullname', 'car', 'employee', 'date_ordered', 'date_sold', 'price')
+    list_select_related = ('fullname', 'car__manufacturer', 'employee__fullname', 'employee__position')
+    list_filter = ('date_ordered',)
+    search_fields = ('^fullname__surname',)
+
+    # Archived orders are history, `manage.py archiveorders` is the only way in.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,236 @@
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from asgiref.local import Local
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models
+from django.db.migrations import AddIndex, Migration
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+logger = logging.getLogger(__name__)
+
+SEEKS = ('exact', 'in')
+SCANS = ('gt', 'gte', 'lt', 'lte', 'range')
+
+_state = Local()
+
+
+def record(model, lookups):
+    """Notes that the current request filters `model` with `lookups`, if it is being sampled."""
+    samples = getattr(_state, 'samples', None)
+    if samples is not None and lookups:
+        samples.add((model._meta.label_lower, lookups))
+
+
+class SqlTimer:
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class FilterTrafficMiddleware:
+    """
+    Logs the filter shapes (field paths and lookups, not values) of a
+    SHOWROOM_FILTER_SAMPLE_RATE fraction of requests with the request's SQL time,
+    as input for `manage.py adviseindexes`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.SHOWROOM_FILTER_SAMPLE_RATE
+        if random.random() >= rate:
+            return self.get_response(request)
+        samples = _state.samples = set()
+        timer = SqlTimer()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _state.samples = None
+        match = request.resolver_match
+        for model, lookups in samples:
+            logger.info(json.dumps({
+                'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'view': match.view_name if match else None,
+                'model': model,
+                'lookups': lookups,
+                'sql': round(timer.seconds, 6),
+                'rate': rate,
+            }))
+        return response
+
+
+def _resolve(model, path):
+    field = None
+    for part in path.split('__'):
+        if field is not None:
+            model = field.related_model
+        field = model._meta.get_field(part)
+    return model, field
+
+
+def indexable_columns(model, lookups):
+    """
+    Maps every model a filter shape touches to the (seek, scan) fields a B-tree
+    index could use there. Text and many-to-many lookups are left out.
+    """
+    columns = defaultdict(lambda: (set(), set()))
+    for lookup in lookups:
+        path, _, kind = lookup.rpartition('__')
+        target, field = _resolve(model, path)
+        if not field.concrete or field.many_to_many or kind not in SEEKS + SCANS:
+            continue
+        seeks, scans = columns[target]
+        (seeks if kind in SEEKS else scans).add(field.name)
+    return columns
+
+
+def existing_indexes(model):
+    """Field name tuples of the indexes the model already has, so that their prefixes count as covered."""
+    indexes = [(f.name,) for f in model._meta.concrete_fields if f.primary_key or f.unique or f.db_index]
+    indexes += [tuple(f.lstrip('-') for f in index.fields) for index in model._meta.indexes]
+    indexes += [tuple(c.fields) for c in model._meta.constraints if isinstance(c, models.UniqueConstraint)]
+    indexes += [tuple(fields) for fields in model._meta.unique_together]
+    return indexes
+
+
+def _covered(fields, indexes):
+    return any(index[:len(fields)] == fields for index in indexes)
+
+
+class Shape:
+    def __init__(self, model, seeks, scans):
+        self.model = model
+        self.seeks = seeks
+        self.scans = scans
+        self.samples = 0
+        self.seconds = 0.0
+        self.served = max((self.usable(index) for index in existing_indexes(model)), default=0)
+
+    @property
+    def columns(self):
+        return self.seeks | self.scans
+
+    def candidates(self):
+        """Every single column, plus the seek columns followed by each scan column."""
+        seeks = sorted(self.seeks)
+        yield from ((c,) for c in seeks + sorted(self.scans))
+        for scan in sorted(self.scans) or [None]:
+            fields = tuple(seeks) + ((scan,) if scan else ())
+            if len(fields) > 1:
+                yield fields
+
+    def usable(self, fields):
+        """How many leading fields of an index on `fields` this shape can seek or range-scan through."""
+        used = 0
+        for field in fields:
+            if field in self.seeks:
+                used += 1
+            elif field in self.scans:
+                return used + 1
+            else:
+                break
+        return used
+
+
+class Recommendation:
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.samples = 0
+        self.benefit = 0.0
+        self.views = set()
+
+    def index(self):
+        index = models.Index(fields=list(self.fields))
+        index.set_name_with_model(self.model)
+        return index
+
+    def __str__(self):
+        return f'{self.model._meta.label}({", ".join(self.fields)})'
+
+
+def read_traffic(records):
+    """Aggregates logged filter samples into shapes per model, extrapolating SQL time by the sample rate."""
+    shapes, views = {}, defaultdict(set)
+    for record in records:
+        try:
+            model = apps.get_model(record['model'])
+            columns = indexable_columns(model, record['lookups'])
+        except (LookupError, models.FieldDoesNotExist):
+            continue
+        for target, (seeks, scans) in columns.items():
+            key = (target, frozenset(seeks), frozenset(scans))
+            shape = shapes.get(key)
+            if shape is None:
+                shape = shapes[key] = Shape(target, frozenset(seeks), frozenset(scans))
+            shape.samples += 1
+            shape.seconds += record['sql'] / record['rate']
+            views[key].add(record['view'])
+    return [(shape, views[key]) for key, shape in shapes.items()]
+
+
+def advise(records, limit=10, min_samples=1):
+    """
+    Ranks candidate indexes by estimated benefit: the extrapolated SQL time of
+    the requests whose filters they serve, weighted by the share of each
+    request's filter columns the index can use beyond what existing indexes
+    already do. Candidates that an existing or better-ranked index covers as a
+    prefix are dropped.
+    """
+    candidates = {}
+    traffic = read_traffic(records)
+    for shape, _ in traffic:
+        for fields in shape.candidates():
+            candidates.setdefault((shape.model, fields), Recommendation(shape.model, fields))
+    for (model, fields), candidate in candidates.items():
+        for shape, views in traffic:
+            gained = shape.usable(fields) - shape.served if shape.model is model else 0
+            if gained > 0:
+                candidate.samples += shape.samples
+                candidate.benefit += shape.seconds * gained / len(shape.columns)
+                candidate.views |= views - {None}
+
+    chosen = defaultdict(list)
+    recommendations = []
+    for candidate in sorted(candidates.values(), key=lambda c: (-c.benefit, len(c.fields))):
+        indexes = existing_indexes(candidate.model) + chosen[candidate.model]
+        if candidate.samples < min_samples or candidate.benefit <= 0 or _covered(candidate.fields, indexes):
+            continue
+        chosen[candidate.model].append(candidate.fields)
+        recommendations.append(candidate)
+        if len(recommendations) == limit:
+            break
+    return recommendations
+
+
+def write_migration(recommendations, app_label='showroom', name='advised_indexes'):
+    """Writes a migration adding the recommended indexes and returns its path."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaves = loader.graph.leaf_nodes(app_label)
+    number = max((MigrationAutodetector.parse_number(n) or 0 for _, n in leaves), default=0) + 1
+    migration = Migration(f'{number:04d}_{name}', app_label)
+    migration.dependencies = leaves
+    migration.operations = [AddIndex(r.model._meta.model_name, r.index()) for r in recommendations]
+    writer = MigrationWriter(migration)
+    with open(writer.path, 'w', encoding='utf-8') as stream:
+        stream.write(writer.as_string())
+    return writer.path
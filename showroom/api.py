@@ -0,0 +1,231 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, SuspiciousOperation
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from showroom import archive, changes, repricing
+from showroom.cache import catalogue_cache
+from showroom.facets import facet_counts
+from showroom.filters import CAR_FILTERS, EMPLOYEE_FILTERS, ORDER_FILTERS
+from showroom.models import ArchivedOrder, Car, CarFacility, Employee, Manufacturer, Order
+from showroom.pagination import split_params
+from showroom.utils import API_CHUNK_SIZE, CHANGES_PAGE_SIZE, CHANGES_PAGE_SIZE_MAX, REPRICE_DIFFS_MAX
+
+CAR_FIELDS = (
+    'id', 'brand', 'color', 'price', 'date_produced', 'body_number', 'engine_number', 'specifications',
+    'manufacturer', 'manufacturer__name', 'manufacturer__country', 'body_type', 'body_type__name',
+    'employee', 'facilities', 'state', 'updated_at',
+)
+ORDER_FIELDS = (
+    'id', 'fullname', 'fullname__first_name', 'fullname__surname', 'car', 'car__brand', 'car__price',
+    'car__manufacturer', 'car__manufacturer__name', 'employee', 'date_ordered', 'date_sold',
+    'is_processed', 'is_paid', 'prepay_percent', 'price', 'updated_at',
+)
+EMPLOYEE_FIELDS = (
+    'id', 'fullname', 'fullname__first_name', 'fullname__second_name', 'fullname__surname',
+    'position', 'position__name', 'age', 'sex', 'updated_at',
+)
+MANUFACTURER_FIELDS = ('id', 'name', 'address', 'country', 'employee', 'updated_at')
+
+# Change feed names, the models their current rows are read from and the fields sent.
+FEED = {
+    'car': ((Car,), CAR_FIELDS),
+    'order': ((Order, ArchivedOrder), ORDER_FIELDS),
+    'employee': ((Employee,), EMPLOYEE_FIELDS),
+    'manufacturer': ((Manufacturer,), MANUFACTURER_FIELDS),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def stream_values(queryset, fields, chunk_size=API_CHUNK_SIZE, extend=None):
+    """
+    Yields `.values()` dicts of the queryset in primary key order, one bounded
+    chunk at a time, so memory stays flat even on backends without server-side cursors.
+    `extend` may add values to each chunk of rows, keyed by id, before it's yielded.
+    """
+    columns = ('id',) + tuple(f for f in fields if f != 'id')
+    qs = queryset.order_by('id').values(*columns)
+    last = None
+    while True:
+        chunk = qs if last is None else qs.filter(id__gt=last)
+        rows = list(chunk[:chunk_size])
+        if extend is not None and rows:
+            extend(rows)
+        for row in rows:
+            last = row['id']
+            if 'id' not in fields:
+                del row['id']
+            yield row
+        if len(rows) < chunk_size:
+            return
+
+
+def attach_facilities(rows):
+    facilities = {row['id']: [] for row in rows}
+    links = CarFacility.objects.filter(car__in=facilities).values_list('car', 'facility').order_by('car', 'facility')
+    for car, facility in links:
+        facilities[car].append(facility)
+    for row in rows:
+        row['facilities'] = facilities[row['id']]
+
+
+# Many-to-many fields can't be read through .values(), they are fetched per chunk instead.
+EXTENDED_FIELDS = {
+    'facilities': attach_facilities,
+}
+
+
+def _encode(rows, fmt):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    if fmt == 'ndjson':
+        for row in rows:
+            yield encoder.encode(row) + '\n'
+        return
+    yield '['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + encoder.encode(row)
+    yield ']\n'
+
+
+def _projection(requested, allowed):
+    if not requested:
+        return allowed
+    fields = tuple(requested.split(','))
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def _stream(request, schema, allowed, source=None):
+    try:
+        filters, _ = split_params(request.GET)
+        fields = _projection(filters.pop('fields', None), allowed)
+        fmt = filters.pop('format', 'ndjson')
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown format: {fmt}')
+        kwargs = schema.compile(filters)
+        queryset = schema.model.objects.filter(**kwargs) if source is None else source(kwargs)
+    except ValueError:
+        raise SuspiciousOperation()
+    fields, extend = _extended(fields)
+    rows = stream_values(queryset, fields, extend=extend)
+    return StreamingHttpResponse(_encode(rows, fmt), content_type=FORMATS[fmt])
+
+
+def _extended(fields):
+    """Splits EXTENDED_FIELDS off `fields`, returns the rest and a stream_values() `extend` for them."""
+    extensions = [EXTENDED_FIELDS[f] for f in fields if f in EXTENDED_FIELDS]
+
+    def extend(rows):
+        for extension in extensions:
+            extension(rows)
+
+    return tuple(f for f in fields if f not in EXTENDED_FIELDS), extend if extensions else None
+
+
+@require_GET
+@login_required(login_url='/showroom/login/')
+def cars(request):
+    return _stream(request, CAR_FILTERS, CAR_FIELDS)
+
+
+@require_GET
+@login_required(login_url='/showroom/login/')
+def orders(request):
+    return _stream(request, ORDER_FILTERS, ORDER_FIELDS, source=archive.orders)
+
+
+@require_GET
+@login_required(login_url='/showroom/login/')
+def employees(request):
+    return _stream(request, EMPLOYEE_FILTERS, EMPLOYEE_FIELDS)
+
+
+@require_GET
+@login_required(login_url='/showroom/login/')
+def car_facets(request):
+    try:
+        filters, _ = split_params(request.GET)
+        params = CAR_FILTERS.compile(filters)
+    except ValueError:
+        raise SuspiciousOperation()
+    facets = catalogue_cache.get_or_compute(('facets', sorted(params.items())), lambda: facet_counts(params))
+    return JsonResponse(facets)
+
+
+def _current_rows(name, ids):
+    models, fields = FEED[name]
+    fields, extend = _extended(fields)
+    return {row['id']: row for model in models
+            for row in stream_values(model.objects.filter(pk__in=ids), fields, extend=extend)}
+
+
+@require_GET
+@login_required(login_url='/showroom/login/')
+def changes_feed(request):
+    """
+    Changes to cars, orders, employees and manufacturers after the sequence
+    number `since`, oldest first, each with the object's current fields or as
+    a tombstone. Follow `next` while `more` is true. A 410 means `since` is
+    older than the compacted log and the consumer has to resync from the list
+    endpoints, starting the feed again from the `latest` it read before.
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = max(1, min(int(request.GET.get('limit', CHANGES_PAGE_SIZE)), CHANGES_PAGE_SIZE_MAX))
+        names = request.GET['models'].split(',') if 'models' in request.GET else list(FEED)
+        unknown = set(names) - set(FEED)
+        if unknown:
+            raise ValueError(f'Unknown models: {", ".join(sorted(unknown))}')
+    except ValueError:
+        raise SuspiciousOperation()
+    floor = changes.floor()
+    if since < floor:
+        return JsonResponse(dict(error='Cursor is older than the compacted change log, resync', floor=floor,
+                                 latest=changes.latest()), status=410)
+
+    entries, more = changes.page(since, limit, names)
+    # A page only needs the last change of each object, its current row covers the earlier ones.
+    last = {(e.model, e.object_id): e for e in entries}
+    current = {}
+    for name in names:
+        ids = [pk for (model, pk), e in last.items() if model == name and not e.deleted]
+        current[name] = _current_rows(name, ids) if ids else {}
+    return JsonResponse(dict(
+        changes=[
+            dict(seq=e.id, model=e.model, id=e.object_id, deleted=e.deleted,
+                 data=None if e.deleted else current[e.model].get(e.object_id))
+            for e in sorted(last.values(), key=lambda e: e.id)
+        ],
+        next=entries[-1].id if entries else since,
+        more=more,
+        latest=changes.latest(),
+    ))
+
+
+@require_POST
+@login_required(login_url='/showroom/login/')
+def reprice(request):
+    """
+    Runs the repricing rules of a JSON body {"rules": [...], "apply": false}.
+    It's a dry run unless `apply` is true, and answers with the totals and the
+    first price changes. Staff only; big catalogues are better repriced with
+    the reprice command, which can spread the chunks over processes.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied()
+    try:
+        body = json.loads(request.body)
+        rules = repricing.parse(body.get('rules'))
+        apply = body.get('apply', False) is True
+    except (ValueError, AttributeError):
+        raise SuspiciousOperation()
+    return JsonResponse(repricing.run(rules, dry_run=not apply).summary(REPRICE_DIFFS_MAX))
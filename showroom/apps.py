@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ShowroomConfig(AppConfig):
     name = 'showroom'
+
+    def ready(self):
+        from showroom import signals  # noqa: F401
@@ -0,0 +1,193 @@
+import heapq
+import time
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, Min, Sum
+
+from showroom.cache import bump_generation, get_cache
+from showroom.models import ArchivedOrder, Order
+from showroom.utils import ARCHIVE_BATCH_SIZE, ARCHIVE_HORIZON_TIMEOUT, ARCHIVE_MAX_LAG, ARCHIVE_PAUSE
+
+HORIZON_KEY = 'showroom:archive:horizon'
+
+DATE_FIELDS = ('date_ordered', 'date_sold')
+
+# Whether a lookup on a date column rules out every day up to and including the horizon.
+AFTER_HORIZON = {
+    'exact': lambda value, day: value > day,
+    'gt': lambda value, day: value >= day,
+    'gte': lambda value, day: value > day,
+    'range': lambda value, day: value[0] > day,
+    'in': lambda value, day: min(value) > day,
+}
+
+LAG_QUERIES = {
+    'mysql': 'SHOW SLAVE STATUS',
+    'postgresql': 'SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS lag',
+}
+LAG_COLUMNS = ('Seconds_Behind_Master', 'Seconds_Behind_Source', 'lag')
+
+COMBINE = {
+    Sum: lambda values: sum(values) if values else None,
+    Count: lambda values: sum(values) if values else 0,
+    Max: lambda values: max(values, default=None),
+    Min: lambda values: min(values, default=None),
+}
+
+
+def horizon():
+    """The latest date_ordered or date_sold in the archive, or None while it's empty."""
+    cache = get_cache()
+    day = cache.get(HORIZON_KEY)
+    if day is None:
+        row = ArchivedOrder.objects.aggregate(ordered=Max('date_ordered'), sold=Max('date_sold'))
+        day = max((d for d in row.values() if d is not None), default='')
+        cache.set(HORIZON_KEY, day, ARCHIVE_HORIZON_TIMEOUT)
+    return day or None
+
+
+def reaches_archive(kwargs):
+    """Whether Order filter kwargs can match archived orders, judged by their date bounds alone."""
+    day = horizon()
+    if day is None:
+        return False
+    for key, value in kwargs.items():
+        path, _, lookup = key.rpartition('__')
+        if path in DATE_FIELDS and lookup in AFTER_HORIZON and AFTER_HORIZON[lookup](value, day):
+            return False
+    return True
+
+
+def orders(kwargs):
+    """Orders matching the filter kwargs, with the archive only if the date bounds reach into it."""
+    hot = Order.objects.filter(**kwargs)
+    if not reaches_archive(kwargs):
+        return hot
+    # Archived rows first, unordered reads then come out roughly oldest first like a plain table scan.
+    return HotColdQuerySet([ArchivedOrder.objects.filter(**kwargs), hot])
+
+
+def _value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    for part in name.split('__'):
+        row = getattr(row, part)
+    return row
+
+
+class HotColdQuerySet:
+    """
+    Order and ArchivedOrder behind the part of the QuerySet API the order views,
+    the keyset paginator and the API stream use. Filters apply to both tables;
+    ordered reads fetch each table's rows through its own index and merge them,
+    so a page costs two short range scans instead of a UNION sorted as a whole.
+    """
+
+    def __init__(self, parts, ordering=()):
+        self.parts = parts
+        self.ordering = ordering
+        self.model = Order
+
+    def _chain(self, method, *args, **kwargs):
+        return HotColdQuerySet([getattr(p, method)(*args, **kwargs) for p in self.parts], self.ordering)
+
+    def filter(self, *args, **kwargs):
+        return self._chain('filter', *args, **kwargs)
+
+    def select_related(self, *fields):
+        return self._chain('select_related', *fields)
+
+    def values(self, *fields):
+        return self._chain('values', *fields)
+
+    def order_by(self, *keys):
+        return HotColdQuerySet([p.order_by(*keys) for p in self.parts], keys)
+
+    def _merge(self, iterables):
+        if not self.ordering:
+            return chain(*iterables)
+        names = [k.lstrip('-') for k in self.ordering]
+        return heapq.merge(*iterables, key=lambda row: [_value(row, n) for n in names],
+                           reverse=self.ordering[0].startswith('-'))
+
+    def __iter__(self):
+        return iter(self._merge(self.parts))
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice) or k.start or k.step or k.stop is None:
+            raise TypeError('Only [:n] slices are supported')
+        return list(islice(self._merge([p[:k.stop] for p in self.parts]), k.stop))
+
+    def count(self):
+        return sum(p.count() for p in self.parts)
+
+    def aggregate(self, **aggregates):
+        results = [p.aggregate(**aggregates) for p in self.parts]
+        return {name: COMBINE[type(a)]([r[name] for r in results if r[name] is not None])
+                for name, a in aggregates.items()}
+
+
+def archivable(before):
+    """Orders that are done with: processed, paid, and ordered and sold before the cutoff day."""
+    return Order.objects.filter(is_processed=True, is_paid=True, date_ordered__lt=before, date_sold__lt=before)
+
+
+def move(ids, before):
+    """Moves the still archivable orders among `ids` with one INSERT ... SELECT and one DELETE."""
+    with transaction.atomic():
+        ids = list(archivable(before).filter(pk__in=ids).select_for_update().values_list('id', flat=True))
+        if not ids:
+            return 0
+        names = [f.attname for f in Order._meta.concrete_fields]
+        columns = ', '.join(connection.ops.quote_name(ArchivedOrder._meta.get_field(f.name).column)
+                            for f in Order._meta.concrete_fields)
+        select, params = Order.objects.filter(pk__in=ids).values_list(*names).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {connection.ops.quote_name(ArchivedOrder._meta.db_table)} '
+                           f'({columns}) {select}', params)
+        # The rows live on in the archive, so the rollup and availability receivers must not see a delete.
+        Order.objects.filter(pk__in=ids)._raw_delete(connection.alias)
+    return len(ids)
+
+
+def replica_lag():
+    """Seconds the furthest behind read replica lags, 0 where the backend can't tell."""
+    lags = [0]
+    for alias in settings.SHOWROOM_READ_REPLICAS:
+        replica = connections[alias]
+        if replica.vendor not in LAG_QUERIES:
+            continue
+        with replica.cursor() as cursor:
+            cursor.execute(LAG_QUERIES[replica.vendor])
+            row = cursor.fetchone()
+            if row:
+                status = dict(zip([c[0] for c in cursor.description], row))
+                lags += [status[c] for c in LAG_COLUMNS if status.get(c) is not None]
+    return max(lags)
+
+
+def run(before, batch_size=ARCHIVE_BATCH_SIZE, pause=ARCHIVE_PAUSE, max_lag=ARCHIVE_MAX_LAG, progress=None):
+    """
+    Archives the orders archivable() before the cutoff in id order, one batch
+    per transaction, so an interrupted run simply resumes with what is left.
+    Between batches it pauses and waits for the replicas to be within
+    `max_lag` seconds. Returns the number of orders moved.
+    """
+    pending = archivable(before).order_by('id').values_list('id', flat=True)
+    moved, last = 0, 0
+    while True:
+        ids = list(pending.filter(id__gt=last)[:batch_size])
+        if not ids:
+            return moved
+        moved += move(ids, before)
+        last = ids[-1]
+        get_cache().delete(HORIZON_KEY)
+        for model in (Order, ArchivedOrder):
+            bump_generation(model)
+        if progress is not None:
+            progress(moved, last)
+        time.sleep(pause)
+        while replica_lag() > max_lag:
+            time.sleep(max(pause, 1))
@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, Max, OuterRef, Value, When
+
+from django.utils import timezone
+
+from showroom import changes
+from showroom.cache import bump_generation
+from showroom.models import ArchivedOrder, Car, Order
+from showroom.utils import IMPORT_BATCH_SIZE
+
+
+def computed_state():
+    """Car.state as derived from the car's orders: sold once one is paid or archived, reserved while any is open."""
+    orders = Order.objects.filter(car=OuterRef('pk'))
+    return Case(
+        When(Exists(orders.filter(is_paid=True)), then=Value(Car.SOLD)),
+        When(Exists(ArchivedOrder.objects.filter(car=OuterRef('pk'))), then=Value(Car.SOLD)),
+        When(Exists(orders), then=Value(Car.RESERVED)),
+        default=Value(Car.AVAILABLE),
+        output_field=CharField(),
+    )
+
+
+def sync(car_ids):
+    """
+    Recomputes the state of the given cars from their orders. Cars whose state
+    changed are touched and logged, so cached car pages, ETags and the change
+    feed move on.
+    """
+    car_ids = [pk for pk in set(car_ids) if pk is not None]
+    if not car_ids:
+        return 0
+    with transaction.atomic():
+        changed = list(Car.objects.filter(pk__in=car_ids).exclude(state=computed_state()).values_list('id', flat=True))
+        if changed:
+            Car.objects.filter(pk__in=changed).update(state=computed_state(), updated_at=timezone.now())
+            changes.record(Car, changed)
+            transaction.on_commit(lambda: bump_generation(Car))
+    return len(changed)
+
+
+def repair(batch_size=IMPORT_BATCH_SIZE, fix=True, progress=None):
+    """
+    Compares the stored state of every car with its orders, `batch_size` ids
+    at a time, and rewrites the cars that differ unless `fix` is off.
+    Returns the number of differing cars per state they should be in.
+    """
+    last = Car.objects.aggregate(last=Max('id'))['last'] or 0
+    wrong = defaultdict(int)
+    for start in range(0, last, batch_size):
+        rows = Car.objects.filter(id__gt=start, id__lte=start + batch_size).annotate(
+            computed=computed_state()).values_list('id', 'state', 'computed')
+        stale = [(pk, computed) for pk, state, computed in rows if state != computed]
+        for _, computed in stale:
+            wrong[computed] += 1
+        if fix:
+            # Recomputed in the UPDATE itself, so orders placed since the read are taken into account.
+            sync(pk for pk, _ in stale)
+        if progress is not None:
+            progress(min(start + batch_size, last), len(stale))
+    return dict(wrong)
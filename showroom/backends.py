@@ -0,0 +1,33 @@
+from django.contrib.auth.backends import ModelBackend
+from django.conf import settings
+from django.core.cache import caches
+
+from showroom.metrics import record_cache
+from showroom.utils import USER_CACHE_TIMEOUT
+
+
+def user_cache_key(user_id):
+    return f'showroom:user:{user_id}'
+
+
+def forget_user(user_id):
+    caches[settings.SHOWROOM_CACHE].delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the user loaded for each request in the cache for
+    USER_CACHE_TIMEOUT seconds. Saving, deleting or logging out the user drops
+    the entry, so password and is_active changes apply on the next request.
+    """
+
+    def get_user(self, user_id):
+        cache = caches[settings.SHOWROOM_CACHE]
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        record_cache(user is not None)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
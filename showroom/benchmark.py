@@ -0,0 +1,179 @@
+import math
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connections
+from django.db.models import Count, Max
+from django.test import Client
+from django.test.utils import override_settings
+
+from showroom import placement
+from showroom.cache import get_cache
+from showroom.models import BodyType, Car, Manufacturer, Order
+from showroom.querycount import record_queries
+
+BENCH_USER = 'benchmark'
+
+# (name, url) pairs driven through the test client, grouped by view.
+SCENARIOS = (
+    ('cars-page', '/showroom/cars/?limit=24'),
+    ('cars-deep-page', '/showroom/cars/?limit=24&price__gte=40000'),
+    ('cars-price-range', '/showroom/cars/?limit=24&price__range=20000,30000&color=red'),
+    ('cars-country', '/showroom/cars/?limit=24&manufacturer__country=DE'),
+    ('cars-facility', '/showroom/cars/?limit=24&facilities=1'),
+    ('cars-search', '/showroom/cars/search/?q=turbo+diesel'),
+    ('orders-page', '/showroom/orders/?limit=24'),
+    ('orders-paid', '/showroom/orders/?limit=24&is_paid=1'),
+    ('orders-range', '/showroom/orders/?limit=24&date_ordered__gte=2024-01-01'),
+    ('employees', '/showroom/employees/'),
+    ('sales-month', '/showroom/reports/sales/?group=month&format=json'),
+    ('sales-country', '/showroom/reports/sales/?group=country&format=json'),
+    ('api-cars', '/showroom/api/cars/?fields=id,brand,price&color=red'),
+)
+
+UNPAGINATED = (
+    ('cars-all', '/showroom/cars/'),
+    ('orders-all', '/showroom/orders/'),
+)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def bench(client, name, url, repeat, cold=False):
+    """Runs one scenario `repeat` times and summarizes latency, queries and peak memory."""
+    _get(client, url)
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cold:
+            get_cache().clear()
+            client.force_login(get_user_model().objects.get(username=BENCH_USER))
+        with record_queries() as recorder:
+            start = time.perf_counter()
+            response = _get(client, url)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(recorder))
+
+    # Measured apart from the timings, tracemalloc slows everything down.
+    tracemalloc.start()
+    _get(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return dict(
+        name=name,
+        url=url,
+        status=response.status_code,
+        p50_ms=round(percentile(timings, 50), 2),
+        p95_ms=round(percentile(timings, 95), 2),
+        mean_ms=round(sum(timings) / len(timings), 2),
+        queries=max(queries),
+        peak_kb=round(peak / 1024, 1),
+    )
+
+
+def run(scenarios, repeat, cold=False, progress=None):
+    user, _ = get_user_model().objects.get_or_create(username=BENCH_USER)
+    client = Client()
+    results = []
+    with override_settings(ALLOWED_HOSTS=['testserver'], SHOWROOM_QUERY_BUDGET_STRICT=False):
+        client.force_login(user)
+        for name, url in scenarios:
+            result = bench(client, name, url, repeat, cold)
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+# distinct: each worker sells its own cars, spread over manufacturers and body types.
+# launch: the same, but all cars are one model, so every sale of the day updates one DailySales row.
+# shared: every worker goes after every car.
+PLACEMENT_MODES = ('distinct', 'launch', 'shared')
+
+
+def placement_cars(count, spread=True):
+    """Creates `count` unsold cars, spread over the existing manufacturers and body types or all of the first."""
+    numbers = (Car.objects.aggregate(last=Max('body_number'))['last'] or 0) + 1
+    engines = (Car.objects.aggregate(last=Max('engine_number'))['last'] or 0) + 1
+    manufacturers = list(Manufacturer.objects.order_by('id').values_list('id', flat=True)[:50])
+    body_types = list(BodyType.objects.order_by('id').values_list('id', flat=True))
+    if not spread:
+        manufacturers, body_types = manufacturers[:1], body_types[:1]
+    kinds = cycle([(m, b) for m in manufacturers for b in body_types])
+    cars = []
+    for i in range(count):
+        manufacturer, body_type = next(kinds)
+        cars.append(Car.objects.create(
+            manufacturer_id=manufacturer, body_type_id=body_type, brand='Placement bench', color='white',
+            body_number=numbers + i, engine_number=engines + i, specifications='benchmark', price=10000,
+        ).pk)
+    return cars
+
+
+def place_concurrently(cars, workers, mode, fullname):
+    """
+    Places orders for `cars` from `workers` threads, each on its own connection.
+    In the shared mode every worker goes after every car in its own random
+    order, otherwise each worker sells a disjoint slice of the cars.
+    """
+    shared = mode == 'shared'
+    counts = Counter()
+    lock = threading.Lock()
+
+    def work(worker):
+        done = Counter()
+        mine = random.sample(cars, len(cars)) if shared else cars[worker::workers]
+        try:
+            for car in mine:
+                try:
+                    placement.place_order(car, fullname_id=fullname, phone=100000000, passport=100000000)
+                    done['placed'] += 1
+                except placement.CarUnavailable:
+                    done['unavailable'] += 1
+                except placement.PlacementConflict:
+                    done['conflicts'] += 1
+                except DatabaseError:
+                    done['errors'] += 1
+        finally:
+            connections.close_all()
+        with lock:
+            counts.update(done)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    sold = Order.objects.filter(car__in=cars).values('car').annotate(n=Count('id'))
+    return dict(
+        mode=mode,
+        workers=workers,
+        cars=len(cars),
+        placed=counts['placed'],
+        unavailable=counts['unavailable'],
+        conflicts=counts['conflicts'],
+        errors=counts['errors'],
+        seconds=round(elapsed, 3),
+        orders_per_s=round(counts['placed'] / elapsed, 1),
+        unsold=len(cars) - sold.count(),
+        double_sales=sold.filter(n__gt=1).count(),
+    )
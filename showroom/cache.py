@@ -0,0 +1,134 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from showroom.metrics import record_cache
+from showroom.models import (
+    ArchivedOrder, BodyType, Car, CarFacility, Employee, Facility, Fullname, Manufacturer, Order, Position,
+)
+from showroom.routers import reading_replicas
+from showroom.utils import CACHE_LOCK_TIMEOUT, CACHE_LOCK_WAIT, CATALOGUE_CACHE_TIMEOUT
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[settings.SHOWROOM_CACHE]
+
+
+def generation_key(model):
+    return f'showroom:generation:{model._meta.label_lower}'
+
+
+def bumped_key(model):
+    return f'showroom:bumped:{model._meta.label_lower}'
+
+
+def bump_generation(model):
+    """Invalidates every VersionedCache entry that depends on `model`."""
+    cache, key = get_cache(), generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _initial_generation(), None):
+            cache.incr(key)
+    # Replicas may lag behind the change for as long as a writer is kept on the primary.
+    cache.set(bumped_key(model), 1, settings.SHOWROOM_PRIMARY_STICKY_SECONDS)
+
+
+def _initial_generation():
+    # An evicted counter restarts above any value it could have had before,
+    # so entries written under the old value are never read again.
+    return int(time.time() * 1000)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class VersionedCache:
+    """
+    Query-result cache whose keys embed the generation counters of the models
+    the result depends on. Saving or deleting any of them bumps its counter,
+    so old entries are never read again and simply age out.
+
+    Results read from a replica are kept apart from those read from the
+    primary, so a client kept on the primary to see its own writes is never
+    served what a lagging replica returned. Nor are they stored while a
+    replica may still lack a change that bumped the generation.
+    """
+
+    def __init__(self, namespace, models, timeout=CATALOGUE_CACHE_TIMEOUT):
+        self.namespace = namespace
+        self.models = models
+        self.timeout = timeout
+        self.stats = CacheStats()
+
+    def version(self):
+        cache = get_cache()
+        keys = [generation_key(m) for m in self.models]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, _initial_generation(), None)
+                found[key] = cache.get(key)
+        return '.'.join(str(found[k]) for k in keys)
+
+    def key(self, params):
+        digest = hashlib.md5(repr(params).encode()).hexdigest()
+        source = 'replica' if reading_replicas() else 'primary'
+        return f'showroom:{self.namespace}:{source}:{self.version()}:{digest}'
+
+    def settling(self):
+        """Whether a model was changed so recently that a replica may not have caught up."""
+        return bool(get_cache().get_many([bumped_key(m) for m in self.models]))
+
+    def get_or_compute(self, params, compute):
+        """
+        Returns the cached result for `params`, computing it on a miss.
+        Only one caller recomputes a missing key; the others wait for its result.
+        """
+        cache, key = get_cache(), self.key(params)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats.hits += 1
+            record_cache(True)
+            return value
+        self.stats.misses += 1
+        record_cache(False)
+        if reading_replicas() and self.settling():
+            return compute()
+
+        lock = f'{key}:lock'
+        locked = cache.add(lock, 1, CACHE_LOCK_TIMEOUT)
+        if not locked:
+            deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(CACHE_LOCK_WAIT)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+        try:
+            value = compute()
+            cache.set(key, value, self.timeout)
+        finally:
+            if locked:
+                cache.delete(lock)
+        return value
+
+
+catalogue_cache = VersionedCache('cars', (Car, Manufacturer, BodyType, Facility, CarFacility))
+order_cache = VersionedCache('orders', (Order, ArchivedOrder, Fullname, Car, Manufacturer, Employee))
+employee_cache = VersionedCache('employees', (Employee, Fullname, Position))
+
+# Every model a VersionedCache depends on, whose saves and deletes must bump its generation.
+CACHED_MODELS = {m for c in (catalogue_cache, order_cache, employee_cache) for m in c.models}
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from showroom.models import ArchivedOrder, Car, ChangeLog, ChangeLogCompaction, Employee, Manufacturer, Order
+from showroom.utils import CHANGES_SETTLE_SECONDS, CHANGES_TOMBSTONE_DAYS, IMPORT_BATCH_SIZE
+
+# Feed names of the tracked models; archived orders are still orders to a consumer.
+NAMES = {
+    Car: 'car',
+    Order: 'order',
+    ArchivedOrder: 'order',
+    Employee: 'employee',
+    Manufacturer: 'manufacturer',
+}
+
+
+def record(model, ids, deleted=False, batch_size=IMPORT_BATCH_SIZE):
+    """Appends a change for each id. Call it inside the transaction that made the changes."""
+    if model in NAMES:
+        ChangeLog.objects.bulk_create([ChangeLog(model=NAMES[model], object_id=pk, deleted=deleted) for pk in ids],
+                                      batch_size=batch_size)
+
+
+def touch(model, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Marks the rows of a queryset changed: their updated_at moves in one UPDATE,
+    and a change is appended for each, `batch_size` ids at a time. Call it
+    inside the transaction that changed what they show.
+    """
+    rows.update(updated_at=timezone.now())
+    ids, last = rows.order_by('id').values_list('id', flat=True), 0
+    while True:
+        batch = list(ids.filter(id__gt=last)[:batch_size])
+        if not batch:
+            return
+        record(model, batch, batch_size=batch_size)
+        last = batch[-1]
+
+
+def record_created(model, after):
+    """Records the rows a bulk_create added, found as the ids above the previous highest one."""
+    if model in NAMES:
+        record(model, model.objects.filter(id__gt=after).values_list('id', flat=True))
+
+
+def latest():
+    return ChangeLog.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def floor():
+    """Cursors below this may have missed deletions purged by compact() and must resync."""
+    return ChangeLogCompaction.objects.aggregate(floor=Max('floor'))['floor'] or 0
+
+
+def page(since, limit, names):
+    """
+    Up to `limit` changes after the sequence number `since`, and whether more
+    follow. Changes younger than CHANGES_SETTLE_SECONDS are held back, along
+    with everything after them: a sequence number is taken at INSERT but only
+    visible at COMMIT, so a slower transaction may still fill a gap below them.
+    """
+    settled = timezone.now() - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    rows = list(ChangeLog.objects.filter(id__gt=since, model__in=names).order_by('id')[:limit + 1])
+    ready = []
+    for row in rows:
+        if row.changed_at > settled:
+            return ready, False
+        ready.append(row)
+    return ready[:limit], len(ready) > limit
+
+
+def compact(tombstone_days=CHANGES_TOMBSTONE_DAYS, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Drops every change superseded by a later one of the same object, then the
+    deletions older than `tombstone_days`, in id batches. What's left is one
+    row per live object plus the recent deletions. Returns the rows removed.
+    """
+    later = ChangeLog.objects.filter(model=OuterRef('model'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'))
+    last, removed = latest(), 0
+    for start in range(0, last, batch_size):
+        ids = list(ChangeLog.objects.filter(Exists(later), id__gt=start, id__lte=start + batch_size).values_list(
+            'id', flat=True))
+        removed += ChangeLog.objects.filter(id__in=ids).delete()[0]
+
+    tombstones = ChangeLog.objects.filter(deleted=True, changed_at__lt=timezone.now() - timedelta(days=tombstone_days))
+    purged = tombstones.aggregate(last=Max('id'))['last']
+    if purged is not None:
+        # The floor is raised before the tombstones go, an interrupted run leaves no cursor unwarned.
+        compaction = ChangeLogCompaction.objects.create(floor=max(purged, floor()), removed=removed)
+        while True:
+            ids = list(tombstones.filter(id__lte=purged).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            removed += ChangeLog.objects.filter(id__in=ids).delete()[0]
+        compaction.removed = removed
+        compaction.save()
+    elif removed:
+        ChangeLogCompaction.objects.create(floor=floor(), removed=removed)
+    return removed
@@ -0,0 +1,174 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from showroom import availability, rollup, search
+from showroom.cache import CACHED_MODELS, bump_generation
+from showroom.models import BodyType, Car, CarFacility, Employee, Facility, Fullname, Manufacturer, Order, Position
+from showroom.utils import IMPORT_BATCH_SIZE
+
+SIZES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+COUNTRIES = ('DE', 'JP', 'US', 'KR', 'FR', 'IT', 'GB', 'SE', 'CN', 'CZ', 'ES', 'IN')
+COLORS = ('black', 'white', 'silver', 'grey', 'red', 'blue', 'green', 'brown', 'yellow', 'orange')
+BODY_TYPES = ('Sedan', 'Hatchback', 'Wagon', 'Coupe', 'Convertible', 'SUV', 'Crossover', 'Minivan', 'Pickup')
+FACILITIES = (
+    ('Air conditioning', 900), ('Climate control', 1500), ('Heated seats', 600), ('Leather interior', 2500),
+    ('Sunroof', 1200), ('Navigation', 1100), ('Parking sensors', 500), ('Rear camera', 700),
+    ('Adaptive cruise control', 1800), ('Lane assist', 1300), ('Premium audio', 1600), ('Tow bar', 800),
+    ('Alloy wheels', 1000), ('LED headlights', 1400), ('Keyless entry', 450), ('Head-up display', 1700),
+)
+POSITIONS = (
+    ('Salesperson', 2500), ('Senior salesperson', 3500), ('Sales manager', 5000), ('Mechanic', 3000),
+    ('Accountant', 3200), ('Director', 9000),
+)
+FIRST_NAMES = ('Anna', 'Ben', 'Clara', 'David', 'Eva', 'Felix', 'Greta', 'Hans', 'Ida', 'Jonas', 'Karin', 'Lukas',
+               'Mia', 'Noah', 'Olga', 'Paul', 'Rita', 'Simon', 'Tina', 'Uwe', 'Vera', 'Walter', 'Yara', 'Zoe')
+SURNAMES = ('Muller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann',
+            'Koch', 'Richter', 'Klein', 'Wolf', 'Neumann', 'Schwarz', 'Braun', 'Zimmermann', 'Hartmann', 'Lange')
+SPECIFICATIONS = ('turbo', 'diesel', 'petrol', 'hybrid', 'electric', 'automatic', 'manual', 'all-wheel drive',
+                  'front-wheel drive', 'sport package', 'long range', 'low mileage', 'one owner', 'winter tyres')
+
+
+class Generator:
+    """
+    Writes a seeded, reproducible showroom dataset with bulk inserts.
+    Primary keys are assigned up front so rows can reference each other
+    without reading ids back, which bulk_create can't do on MySQL.
+    """
+
+    def __init__(self, orders, seed=0, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        self.orders = orders
+        self.cars = max(10, orders * 3 // 5)
+        self.employees = max(10, orders // 500)
+        self.manufacturers = max(len(COUNTRIES), min(300, orders // 1000))
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda model, count: None)
+        self.today = date.today()
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def _write(self, model, objs):
+        batch, total = [], 0
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                total += self._flush(model, batch)
+                batch = []
+        total += self._flush(model, batch)
+        self.progress(model, total)
+
+    def _flush(self, model, batch):
+        if batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+        return len(batch)
+
+    def _fullnames(self, count):
+        start = self._next_id(Fullname)
+        self._write(Fullname, (
+            Fullname(id=start + i, first_name=self.random.choice(FIRST_NAMES),
+                     second_name=self.random.choice(FIRST_NAMES) if self.random.random() < 0.3 else None,
+                     surname=self.random.choice(SURNAMES))
+            for i in range(count)
+        ))
+        return range(start, start + count)
+
+    def _lookup(self, model, rows, build):
+        existing = dict(model.objects.filter(name__in=[r[0] for r in rows]).values_list('name', 'id'))
+        missing = [r for r in rows if r[0] not in existing]
+        self._write(model, (build(*r) for r in missing))
+        return list(model.objects.filter(name__in=[r[0] for r in rows]).values_list('id', flat=True))
+
+    def run(self):
+        rnd = self.random
+        positions = self._lookup(Position, POSITIONS, lambda name, salary: Position(
+            name=name, salary=salary, responsibilities=f'{name} duties', requirements='Experience'))
+        body_types = self._lookup(BodyType, [(n,) for n in BODY_TYPES], lambda name: BodyType(
+            name=name, description=f'{name} body'))
+        facilities = self._lookup(Facility, FACILITIES, lambda name, price: Facility(
+            name=name, specifications=name, price=price))
+
+        fullnames = self._fullnames(self.employees)
+        start = self._next_id(Employee)
+        passports = self._next_passport()
+        employees = range(start, start + self.employees)
+        self._write(Employee, (
+            Employee(id=pk, position_id=rnd.choice(positions), fullname_id=fullname, age=rnd.randint(18, 65),
+                     sex=rnd.choice('MF'), address=f'{rnd.randint(1, 200)} Main street', passport=passports + i)
+            for i, (pk, fullname) in enumerate(zip(employees, fullnames))
+        ))
+
+        start = self._next_id(Manufacturer)
+        manufacturers = range(start, start + self.manufacturers)
+        self._write(Manufacturer, (
+            Manufacturer(id=pk, employee_id=rnd.choice(employees), name=f'Manufacturer {pk}',
+                         address=f'{rnd.randint(1, 500)} Industrial park', country=rnd.choice(COUNTRIES))
+            for pk in manufacturers
+        ))
+
+        start = self._next_id(Car)
+        numbers = (Car.objects.aggregate(last=Max('body_number'))['last'] or 0) + 1
+        engines = (Car.objects.aggregate(last=Max('engine_number'))['last'] or 0) + 1
+        cars = range(start, start + self.cars)
+        self._write(Car, (self._car(pk, numbers + i, engines + i, manufacturers, body_types, employees)
+                          for i, pk in enumerate(cars)))
+        self._write(CarFacility, (
+            CarFacility(car_id=pk, facility_id=facility)
+            for pk in cars for facility in rnd.sample(facilities, rnd.randint(0, 4))
+        ))
+        prices = {}
+        for low in range(cars.start, cars.stop, self.batch_size):
+            batch = Car.objects.filter(id__gte=low, id__lt=min(low + self.batch_size, cars.stop))
+            search.reindex(batch)
+            prices.update(batch.with_sale_price().values_list('id', 'sale_price'))
+
+        fullnames = self._fullnames(self.orders)
+        start = self._next_id(Order)
+        self._write(Order, (self._order(pk, fullname, cars, employees, prices)
+                            for pk, fullname in zip(range(start, start + self.orders), fullnames)))
+        rollup.rebuild()
+        availability.repair(self.batch_size)
+
+        for model in CACHED_MODELS:
+            bump_generation(model)
+
+    def _next_passport(self):
+        return (Employee.objects.aggregate(last=Max('passport'))['last'] or 100000000) + 1
+
+    def _car(self, pk, body_number, engine_number, manufacturers, body_types, employees):
+        rnd = self.random
+        price = Decimal(int(rnd.lognormvariate(10.2, 0.5))).quantize(Decimal('1.00'))
+        return Car(
+            id=pk, manufacturer_id=rnd.choice(manufacturers), body_type_id=rnd.choice(body_types),
+            employee_id=rnd.choice(employees) if rnd.random() < 0.8 else None,
+            brand=f'Model {rnd.choice("ABCDEFGHKLMSXZ")}{rnd.randint(1, 9)}',
+            date_produced=self.today - timedelta(days=rnd.randint(0, 5 * 365)),
+            color=rnd.choice(COLORS), body_number=body_number, engine_number=engine_number,
+            specifications=', '.join(rnd.sample(SPECIFICATIONS, rnd.randint(1, 4))),
+            price=max(price, Decimal('1000.00')),
+        )
+
+    def _order(self, pk, fullname, cars, employees, prices):
+        rnd = self.random
+        ordered = self.today - timedelta(days=rnd.randint(0, 5 * 365))
+        paid = rnd.random() < 0.7
+        car = rnd.choice(cars)
+        return Order(
+            id=pk, fullname_id=fullname, car_id=car, price=prices[car],
+            employee_id=rnd.choice(employees) if rnd.random() < 0.9 else None,
+            address=f'{rnd.randint(1, 999)} Customer road', phone=rnd.randint(10 ** 8, 10 ** 9 - 1),
+            passport=rnd.randint(10 ** 8, 10 ** 9 - 1), date_ordered=ordered,
+            date_sold=min(self.today, ordered + timedelta(days=rnd.randint(0, 60))),
+            is_processed=paid or rnd.random() < 0.5, is_paid=paid,
+            prepay_percent=100 if paid else rnd.choice((0, 10, 20, 30, 50)),
+        )
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from showroom.models import Car, Manufacturer
+from showroom.utils import PRICE_BRACKETS
+
+DIMENSIONS = ('body_type', 'country', 'manufacturer', 'color', 'price')
+
+
+def _bracket():
+    whens = [
+        When(Q(price__gte=low, price__lt=high), then=Value(i))
+        for i, (low, high) in enumerate(zip(PRICE_BRACKETS, PRICE_BRACKETS[1:]))
+    ]
+    return Case(*whens, default=Value(len(PRICE_BRACKETS) - 1), output_field=IntegerField())
+
+
+def _bracket_label(i):
+    if i + 1 < len(PRICE_BRACKETS):
+        return f'${PRICE_BRACKETS[i]}-{PRICE_BRACKETS[i + 1]}'
+    return f'${PRICE_BRACKETS[i]}+'
+
+
+def _bracket_params(i):
+    params = {'price__gte': PRICE_BRACKETS[i]}
+    if i + 1 < len(PRICE_BRACKETS):
+        params['price__lt'] = PRICE_BRACKETS[i + 1]
+    return params
+
+
+def facet_counts(params):
+    """
+    Counts the cars matching the filter `params` per value of every facet
+    dimension. One GROUP BY over all dimensions is rolled up in Python.
+    """
+    rows = Car.objects.filter(**params).annotate(bracket=_bracket()).values(
+        'body_type', 'body_type__name', 'manufacturer', 'manufacturer__name', 'manufacturer__country',
+        'color', 'bracket',
+    ).annotate(count=Count('id')).order_by()
+
+    counts = {d: defaultdict(int) for d in DIMENSIONS}
+    labels = {d: {} for d in DIMENSIONS}
+    for row in rows:
+        for dimension, value, label in (
+                ('body_type', row['body_type'], row['body_type__name']),
+                ('country', row['manufacturer__country'], None),
+                ('manufacturer', row['manufacturer'], row['manufacturer__name']),
+                ('color', row['color'], row['color']),
+                ('price', row['bracket'], None)):
+            counts[dimension][value] += row['count']
+            labels[dimension][value] = label
+
+    labels['country'] = {code: Manufacturer.COUNTRY_NAMES.get(code, code) for code in counts['country']}
+    labels['price'] = {i: _bracket_label(i) for i in counts['price']}
+    facets = {}
+    for dimension in DIMENSIONS:
+        values = sorted(counts[dimension].items(), key=lambda item: (-item[1], str(labels[dimension][item[0]])))
+        if dimension == 'price':
+            values.sort()
+        facets[dimension] = [
+            dict(value=value, label=labels[dimension][value], count=count) for value, count in values
+        ]
+    return facets
+
+
+FACET_PARAMS = {
+    'body_type': 'body_type',
+    'country': 'manufacturer__country',
+    'manufacturer': 'manufacturer',
+    'color': 'color',
+}
+
+
+def facet_params(dimension, value):
+    if dimension == 'price':
+        return _bracket_params(value)
+    return {FACET_PARAMS[dimension]: value}
+
+
+def link_facets(facets, query):
+    """Adds to every facet value the querystring that narrows `query` down to it."""
+    for dimension, values in facets.items():
+        for facet in values:
+            q = query.copy()
+            for p in ('after', 'before'):
+                q.pop(p, None)
+            for param, value in facet_params(dimension, facet['value']).items():
+                q[param] = value
+            facet['query'] = q.urlencode()
+    return facets
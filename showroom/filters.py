@@ -0,0 +1,204 @@
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from showroom import advisor
+from showroom.models import Car, Employee, Facility, Order
+from showroom.utils import FILTER_FEW_CHOICES, FILTER_IN_MAX, FILTER_PARAMS_MAX
+
+EQUALITY = ('exact', 'in')
+RANGE = ('exact', 'gt', 'gte', 'lt', 'lte', 'range')
+FLAG = ('exact',)
+TEXT = ('exact', 'icontains')
+
+MULTI_VALUED = ('in', 'range')
+EXPENSIVE = ('icontains',)
+BOUNDED = ('exact', 'in', 'range')
+LOWER, UPPER = ('gt', 'gte'), ('lt', 'lte')
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _coerce_bool(name, value):
+    value = value.lower()
+    if value in ('1', 'true', 't', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'f', 'no', 'off'):
+        return False
+    raise InvalidFilter(f'{name}: not a boolean: {value!r}')
+
+
+def coerce_value(field, value):
+    name = field.name
+    if field.many_to_many:
+        # Compared as the related primary key; the m2m field's own to_python lets anything through.
+        field = field.target_field
+    if isinstance(field, models.BooleanField):
+        return _coerce_bool(name, value)
+    if isinstance(field, models.CharField) and len(value) > field.max_length:
+        raise InvalidFilter(f'{name}: longer than {field.max_length}')
+    try:
+        value = field.to_python(value)
+    except ValidationError as e:
+        raise InvalidFilter(f'{name}: {e.messages[0]}') from e
+    if isinstance(field, models.DecimalField) and not value.is_finite():
+        raise InvalidFilter(f'{name}: not a finite number')
+    return value
+
+
+class Plan:
+    """Compiled, validated form of one set of filter param names."""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.lookups = tuple(sorted(lookup for _, lookup, _ in steps))
+
+    def kwargs(self, params):
+        return {lookup: coerce(params[param]) for param, lookup, coerce in self.steps}
+
+
+class FilterSchema:
+    """
+    Whitelist of the GET filters a list view accepts: field paths mapped to their allowed lookups.
+    Param values are coerced with the model field they target. Expensive lookups are only
+    allowed next to a filter that narrows the scan: an equality or a range bounded on both
+    ends, on a selective column an index leads with.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = {path: (self._resolve(path), lookups) for path, lookups in fields.items()}
+        self.selective = {path for path in fields if self._selective(path)}
+        self.plan = lru_cache(maxsize=256)(self._compile)
+
+    def _resolve(self, path):
+        model, field = self.model, None
+        for part in path.split('__'):
+            field = model._meta.get_field(part)
+            model = field.related_model
+        return field
+
+    def _leads_index(self, field):
+        if field.primary_key or field.unique or field.db_index or field.is_relation:
+            return True
+        meta = self.model._meta
+        leading = [index.fields[0] for index in meta.indexes] + [
+            constraint.fields[0] for constraint in meta.constraints if getattr(constraint, 'fields', None)]
+        return field.name in leading
+
+    def _selective(self, path):
+        # Through a relation the scan starts from the foreign key's index, whatever the related column.
+        field = self.fields[path][0]
+        if isinstance(field, models.BooleanField) or field.choices and len(field.choices) <= FILTER_FEW_CHOICES:
+            return False
+        return self._leads_index(self.model._meta.get_field(path.split('__')[0]))
+
+    def _split(self, param):
+        if param in self.fields:
+            return param, 'exact'
+        path, _, lookup = param.rpartition('__')
+        return path, lookup
+
+    def _compile(self, names):
+        if len(names) > FILTER_PARAMS_MAX:
+            raise InvalidFilter(f'At most {FILTER_PARAMS_MAX} filters are allowed')
+        steps, lookups = [], {}
+        for param in names:
+            path, lookup = self._split(param)
+            if path not in self.fields:
+                raise InvalidFilter(f'Filtering on {path!r} is not allowed')
+            field, allowed = self.fields[path]
+            if lookup not in allowed:
+                raise InvalidFilter(f'Lookup {lookup!r} is not allowed on {path!r}')
+            steps.append((param, f'{path}__{lookup}', self._coercer(field, lookup)))
+            lookups.setdefault(path, set()).add(lookup)
+        expensive = sorted(p for p in names if self._split(p)[1] in EXPENSIVE)
+        if expensive and not any(self._narrows(path, found) for path, found in lookups.items()):
+            raise InvalidFilter(f'{", ".join(expensive)} must be combined with an equality or a bounded range '
+                                f'on an indexed column')
+        return Plan(steps)
+
+    def _narrows(self, path, lookups):
+        bounded = lookups & set(BOUNDED) or lookups & set(LOWER) and lookups & set(UPPER)
+        return path in self.selective and bool(bounded)
+
+    @staticmethod
+    def _coercer(field, lookup):
+        if lookup not in MULTI_VALUED:
+            return lambda value: coerce_value(field, value)
+
+        def coerce_many(value):
+            values = [coerce_value(field, v) for v in value.split(',')]
+            if lookup == 'range' and len(values) != 2:
+                raise InvalidFilter(f'{field.name}: range takes two comma separated values')
+            if len(values) > FILTER_IN_MAX:
+                raise InvalidFilter(f'{field.name}: at most {FILTER_IN_MAX} values are allowed')
+            return values
+        return coerce_many
+
+    def compile(self, params):
+        """Validates a dict of GET params and returns the matching filter kwargs."""
+        plan = self.plan(frozenset(params))
+        advisor.record(self.model, plan.lookups)
+        return plan.kwargs(params)
+
+    def filter(self, params, queryset=None):
+        queryset = self.model.objects.all() if queryset is None else queryset
+        return queryset.filter(**self.compile(params))
+
+
+CAR_FILTERS = FilterSchema(Car, {
+    'id': EQUALITY,
+    'manufacturer': EQUALITY,
+    'manufacturer__name': EQUALITY,
+    'manufacturer__country': EQUALITY,
+    'body_type': EQUALITY,
+    'body_type__name': EQUALITY,
+    'employee': EQUALITY,
+    'facilities': FLAG,
+    'brand': TEXT,
+    'color': EQUALITY,
+    'body_number': EQUALITY,
+    'engine_number': EQUALITY,
+    'specifications': ('icontains',),
+    'price': RANGE,
+    'date_produced': RANGE,
+    'state': EQUALITY,
+})
+
+ORDER_FILTERS = FilterSchema(Order, {
+    'id': EQUALITY,
+    'fullname': EQUALITY,
+    'car': EQUALITY,
+    'car__manufacturer': EQUALITY,
+    'car__manufacturer__country': EQUALITY,
+    'car__body_type': EQUALITY,
+    'employee': EQUALITY,
+    'passport': EQUALITY,
+    'date_ordered': RANGE,
+    'date_sold': RANGE,
+    'is_processed': FLAG,
+    'is_paid': FLAG,
+    'prepay_percent': RANGE,
+    'price': RANGE,
+})
+
+EMPLOYEE_FILTERS = FilterSchema(Employee, {
+    'id': EQUALITY,
+    'position': EQUALITY,
+    'position__name': EQUALITY,
+    'fullname': EQUALITY,
+    'fullname__surname': EQUALITY,
+    'sex': EQUALITY,
+    'age': RANGE,
+    'passport': EQUALITY,
+})
+
+FACILITY_FILTERS = FilterSchema(Facility, {
+    'id': EQUALITY,
+    'name': EQUALITY,
+    'price': RANGE,
+})
@@ -0,0 +1,284 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from showroom import availability, changes, rollup, search
+from showroom.cache import bump_generation
+from showroom.filters import coerce_value
+from showroom.models import BodyType, Car, CarFacility, Employee, Facility, Fullname, Manufacturer, Order, Position
+from showroom.utils import IMPORT_BATCH_SIZE, IMPORT_ERRORS_MAX
+
+FULLNAME_COLUMNS = ('first_name', 'second_name', 'surname')
+FACILITY_SEPARATOR = ';'
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, dict) pairs from a CSV or NDJSON stream."""
+    if fmt == 'csv':
+        for line, row in enumerate(csv.DictReader(stream), 2):
+            yield line, {k: v for k, v in row.items() if v != ''}
+        return
+    for line, text in enumerate(stream, 1):
+        if text.strip():
+            yield line, {k: str(v) for k, v in json.loads(text).items() if v is not None and v != ''}
+
+
+class Lookup:
+    """In-memory natural key -> id map of a small table, loaded with one query."""
+
+    def __init__(self, model, key):
+        self.model = model
+        self.key = key
+        self.ids = {}
+        self.loaded = False
+
+    def prime(self, keys):
+        if not self.loaded:
+            self.ids = {str(k): pk for k, pk in self.model.objects.values_list(self.key, 'id')}
+            self.loaded = True
+
+    def __getitem__(self, key):
+        try:
+            return self.ids[key]
+        except KeyError:
+            raise RowError(f'Unknown {self.model._meta.model_name} {key!r}') from None
+
+
+class BatchLookup(Lookup):
+    """Lookup for large tables, filled with one query per batch for just the keys it needs."""
+
+    def prime(self, keys):
+        missing = [k for k in keys if k not in self.ids]
+        if missing:
+            field = self.model._meta.get_field(self.key)
+            values = [field.to_python(k) for k in missing]
+            found = self.model.objects.filter(**{f'{self.key}__in': values}).values_list(self.key, 'id')
+            self.ids.update((str(k), pk) for k, pk in found)
+
+
+class Importer:
+    """
+    Builds model instances from rows and writes them with bulk_create, one
+    transaction per batch. Foreign keys are resolved through Lookups by
+    natural key and unique columns are checked for conflicts per batch.
+    """
+    model = None
+    lookups = {}
+    unique = ()
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, on_conflict='skip'):
+        self.batch_size = batch_size
+        self.on_conflict = on_conflict
+        self.caches = {name: lookup(*args) for name, (lookup, *args) in self.lookups.items()}
+        self.seen = {f: set() for f in self.unique}
+        self.errors = []
+        self.created = self.conflicts = self.invalid = 0
+
+    def build(self, row):
+        obj = self.model()
+        for field in self.model._meta.concrete_fields:
+            if field.primary_key or field.name == 'updated_at':
+                continue
+            value = row.get(field.name)
+            if field.name in self.caches:
+                if value is None and not field.null:
+                    raise RowError(f'{field.name} is required')
+                setattr(obj, field.attname, None if value is None else self.caches[field.name][value])
+            elif value is not None:
+                try:
+                    value = coerce_value(field, value)
+                    field.run_validators(value)
+                except ValidationError as e:
+                    raise RowError(f'{field.name}: {e.messages[0]}') from e
+                setattr(obj, field.attname, value)
+            elif not field.has_default() and not field.null and not field.blank and not field.is_relation:
+                raise RowError(f'{field.name} is required')
+        return obj
+
+    def error(self, line, message):
+        if len(self.errors) < IMPORT_ERRORS_MAX:
+            self.errors.append((line, message))
+
+    def resolve(self, pairs):
+        """Hook for relations that are created along with the batch."""
+        return pairs
+
+    def after_create(self, pairs):
+        """Hook for rows that depend on the batch, called in its transaction."""
+
+    def _conflicting(self, pairs):
+        clashes = set()
+        for name in self.unique:
+            values = [getattr(obj, name) for _, obj, _ in pairs]
+            existing = set(self.model.objects.filter(**{f'{name}__in': values}).values_list(name, flat=True))
+            for line, obj, _ in pairs:
+                value = getattr(obj, name)
+                if value in existing or value in self.seen[name]:
+                    clashes.add(line)
+                    self.error(line, f'{name} {value} already exists')
+                self.seen[name].add(value)
+        return clashes
+
+    def import_batch(self, rows):
+        for name, cache in self.caches.items():
+            cache.prime({row[name] for _, row in rows if name in row})
+        pairs = []
+        for line, row in rows:
+            try:
+                pairs.append((line, self.build(row), row))
+            except ValueError as e:
+                self.invalid += 1
+                self.error(line, str(e))
+        clashes = self._conflicting(pairs)
+        if clashes and self.on_conflict == 'fail':
+            raise RowError(f'Conflicting rows: {", ".join(map(str, sorted(clashes)))}')
+        self.conflicts += len(clashes)
+        pairs = [p for p in pairs if p[0] not in clashes]
+        with transaction.atomic():
+            pairs = self.resolve(pairs)
+            last = self.model.objects.aggregate(last=Max('id'))['last'] or 0
+            self.model.objects.bulk_create([obj for _, obj, _ in pairs], batch_size=self.batch_size)
+            changes.record_created(self.model, last)
+            self.after_create(pairs)
+            transaction.on_commit(lambda: bump_generation(self.model))
+        self.created += len(pairs)
+
+    def run(self, rows, progress=None):
+        start = time.monotonic()
+        read = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            read += len(batch)
+            if progress:
+                progress(read, self.rate(read, start))
+        return read, self.rate(read, start)
+
+    @staticmethod
+    def rate(count, start):
+        elapsed = time.monotonic() - start
+        return count / elapsed if elapsed else 0.0
+
+
+class FullnameImporter(Importer):
+    """Importer for models with a Fullname, which is matched or created per batch."""
+
+    def resolve(self, pairs):
+        names = {tuple(row.get(c, '') for c in FULLNAME_COLUMNS) for _, _, row in pairs}
+        ids = self._fullnames(names)
+        missing = names - set(ids)
+        if missing:
+            Fullname.objects.bulk_create([
+                Fullname(first_name=first, second_name=second or None, surname=surname)
+                for first, second, surname in missing
+            ])
+            ids.update(self._fullnames(missing))
+        for _, obj, row in pairs:
+            obj.fullname_id = ids[tuple(row.get(c, '') for c in FULLNAME_COLUMNS)]
+        return pairs
+
+    @staticmethod
+    def _fullnames(names):
+        # bulk_create doesn't return ids on MySQL, so they are read back by name.
+        found = Fullname.objects.filter(surname__in={n[2] for n in names}).values_list(
+            'first_name', 'second_name', 'surname', 'id')
+        ids = {}
+        for first, second, surname, pk in found:
+            ids.setdefault((first, second or '', surname), pk)
+        return {name: pk for name, pk in ids.items() if name in names}
+
+    def build(self, row):
+        if not row.get('first_name') or not row.get('surname'):
+            raise RowError('first_name and surname are required')
+        return super().build(row)
+
+
+class ManufacturerImporter(Importer):
+    model = Manufacturer
+    lookups = {'employee': (Lookup, Employee, 'passport')}
+    unique = ('name',)
+
+    def build(self, row):
+        obj = super().build(row)
+        if obj.country not in Manufacturer.COUNTRY_NAMES:
+            raise RowError(f'Unknown country {obj.country!r}')
+        return obj
+
+
+class CarImporter(Importer):
+    """Facilities come as one `facilities` column of names separated by FACILITY_SEPARATOR."""
+    model = Car
+    lookups = {
+        'manufacturer': (Lookup, Manufacturer, 'name'),
+        'body_type': (Lookup, BodyType, 'name'),
+        'employee': (Lookup, Employee, 'passport'),
+    }
+    unique = ('body_number', 'engine_number')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.facilities = Lookup(Facility, 'name')
+        self.facilities.prime(())
+
+    def build(self, row):
+        obj = super().build(row)
+        names = [n.strip() for n in row.get('facilities', '').split(FACILITY_SEPARATOR) if n.strip()]
+        obj._facility_ids = {self.facilities[n] for n in names}
+        return obj
+
+    def after_create(self, pairs):
+        # bulk_create doesn't return ids on MySQL, so they are read back by body number.
+        cars = Car.objects.filter(body_number__in=[obj.body_number for _, obj, _ in pairs])
+        search.reindex(cars)
+        ids = dict(cars.values_list('body_number', 'id'))
+        CarFacility.objects.bulk_create([
+            CarFacility(car_id=ids[obj.body_number], facility_id=facility)
+            for _, obj, _ in pairs for facility in obj._facility_ids
+        ], batch_size=self.batch_size)
+
+
+class EmployeeImporter(FullnameImporter):
+    model = Employee
+    lookups = {'position': (Lookup, Position, 'name')}
+    unique = ('passport',)
+
+
+class OrderImporter(FullnameImporter):
+    model = Order
+    lookups = {
+        'car': (BatchLookup, Car, 'body_number'),
+        'employee': (Lookup, Employee, 'passport'),
+    }
+
+    def resolve(self, pairs):
+        pairs = super().resolve(pairs)
+        cars = {obj.car_id for _, obj, _ in pairs if obj.price is None}
+        prices = dict(Car.objects.filter(id__in=cars).with_sale_price().values_list('id', 'sale_price'))
+        for _, obj, _ in pairs:
+            if obj.price is None:
+                obj.price = prices[obj.car_id]
+        return pairs
+
+    def after_create(self, pairs):
+        rollup.refresh({obj.date_ordered for _, obj, _ in pairs})
+        availability.sync({obj.car_id for _, obj, _ in pairs})
+
+
+IMPORTERS = {
+    'manufacturers': ManufacturerImporter,
+    'employees': EmployeeImporter,
+    'cars': CarImporter,
+    'orders': OrderImporter,
+}
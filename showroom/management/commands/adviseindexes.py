@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from showroom.advisor import advise, write_migration
+from showroom.slowqueries import read_log
+
+
+class Command(BaseCommand):
+    help = 'Recommends indexes from the logged filter traffic of the list views, optionally as a migration.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(settings.SHOWROOM_FILTER_LOG),
+                            help='Filter traffic log to read, rotated backups included.')
+        parser.add_argument('--limit', type=int, default=10, help='Number of indexes to recommend.')
+        parser.add_argument('--min-samples', type=int, default=20,
+                            help='Ignore candidates served by fewer sampled requests.')
+        parser.add_argument('--migration', action='store_true', help='Write a migration adding the recommended indexes.')
+
+    def handle(self, **options):
+        recommendations = advise(read_log(options['log']), options['limit'], options['min_samples'])
+        if not recommendations:
+            self.stdout.write('No index recommendations.')
+            return
+
+        for rank, r in enumerate(recommendations, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank}  {r}  benefit {r.benefit:.2f}s over {r.samples} sampled requests'))
+            self.stdout.write(f'  views: {", ".join(sorted(r.views)) or "-"}')
+            self.stdout.write(f'  models.Index(fields={list(r.fields)!r}, name={r.index().name!r})')
+        if options['migration']:
+            path = write_migration(recommendations)
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {path}. Add the indexes above to the Meta.indexes of their models as well.'))
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from showroom import archive
+from showroom.utils import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_MAX_LAG, ARCHIVE_PAUSE
+
+
+class Command(BaseCommand):
+    help = ('Moves processed and paid orders ordered and sold before the cutoff into the archive table, '
+            'in batches. Safe to interrupt and rerun.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help=f'Cutoff day, YYYY-MM-DD. Defaults to {ARCHIVE_AFTER_DAYS} days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=ARCHIVE_PAUSE, help='Seconds to sleep between batches.')
+        parser.add_argument('--max-lag', type=float, default=ARCHIVE_MAX_LAG,
+                            help='Wait while a read replica is more than this many seconds behind.')
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would be moved.")
+
+    def handle(self, **options):
+        before = options['before'] or date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+        if options['dry_run']:
+            self.stdout.write(f'{archive.archivable(before).count()} orders before {before} to archive')
+            return
+
+        def progress(moved, last):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{moved} orders archived, up to id {last}')
+
+        moved = archive.run(before, options['batch_size'], options['pause'], options['max_lag'], progress)
+        self.stdout.write(self.style.SUCCESS(f'{moved} orders before {before} archived'))
@@ -0,0 +1,62 @@
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from showroom import benchmark
+from showroom.models import Car, Fullname, Manufacturer
+
+
+class Command(BaseCommand):
+    help = ('Places orders from concurrent threads, for distinct cars, for distinct cars of one model and all '
+            'for the same cars, and checks that no car was sold twice. Creates its own cars and deletes them '
+            'afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=200, help='Cars sold per run.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+        parser.add_argument('--output', default='bench_placement.json')
+        parser.add_argument('--label', default='', help='Free-form run label, e.g. a commit hash.')
+        parser.add_argument('--keep', action='store_true', help="Don't delete the cars and orders afterwards.")
+
+    def handle(self, **options):
+        if not Manufacturer.objects.exists():
+            raise CommandError('No manufacturers to build cars from, run gendata first')
+
+        fullname = Fullname.objects.create(first_name='Placement', surname='Benchmark')
+        created, results = [], []
+        try:
+            for workers in options['workers']:
+                for mode in benchmark.PLACEMENT_MODES:
+                    cars = benchmark.placement_cars(options['cars'], spread=mode != 'launch')
+                    created += cars
+                    r = benchmark.place_concurrently(cars, workers, mode, fullname.pk)
+                    results.append(r)
+                    self.stdout.write(
+                        f'{r["mode"]:<8} {workers:>3} workers  {r["orders_per_s"]:>9.1f} orders/s  '
+                        f'{r["unavailable"]:>6} unavailable  {r["conflicts"]:>4} conflicts  {r["errors"]:>4} errors  '
+                        f'{r["double_sales"]} double sales')
+        finally:
+            if not options['keep']:
+                Car.objects.filter(pk__in=created).delete()
+                fullname.delete()
+
+        for mode in ('distinct', 'launch'):
+            runs = [r for r in results if r['mode'] == mode]
+            for r in runs:
+                r['speedup'] = round(r['orders_per_s'] / runs[0]['orders_per_s'], 2)
+        report = dict(
+            label=options['label'],
+            timestamp=datetime.now().isoformat(timespec='seconds'),
+            database=connection.vendor,
+            python=platform.python_version(),
+            results=results,
+        )
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        if any(r['double_sales'] for r in results):
+            raise CommandError('Some cars were sold more than once')
+        self.stdout.write(self.style.SUCCESS(f'No double sales, results written to {options["output"]}'))
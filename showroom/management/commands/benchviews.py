@@ -0,0 +1,46 @@
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from showroom import benchmark
+from showroom.models import Car, Employee, Order
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the showroom views through the test client and writes the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', default='bench_output.json')
+        parser.add_argument('--label', default='', help='Free-form run label, e.g. a commit hash.')
+        parser.add_argument('--only', nargs='*', help='Scenario names to run.')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--unpaginated', action='store_true', help='Also render the full, unpaginated lists.')
+
+    def handle(self, **options):
+        scenarios = benchmark.SCENARIOS + (benchmark.UNPAGINATED if options['unpaginated'] else ())
+        if options['only']:
+            scenarios = [s for s in scenarios if s[0] in options['only']]
+
+        def progress(r):
+            self.stdout.write(
+                f'{r["name"]:<20} p50 {r["p50_ms"]:>9.2f}ms  p95 {r["p95_ms"]:>9.2f}ms  '
+                f'{r["queries"]:>3} queries  {r["peak_kb"]:>10.1f}KB peak  [{r["status"]}]')
+
+        results = benchmark.run(scenarios, options['repeat'], options['cold'], progress)
+        report = dict(
+            label=options['label'],
+            timestamp=datetime.now().isoformat(timespec='seconds'),
+            database=connection.vendor,
+            python=platform.python_version(),
+            repeat=options['repeat'],
+            cold=options['cold'],
+            dataset=dict(cars=Car.objects.count(), orders=Order.objects.count(), employees=Employee.objects.count()),
+            results=results,
+        )
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
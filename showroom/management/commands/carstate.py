@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from showroom import availability
+from showroom.utils import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Checks the availability state of every car against its orders, in batches, and repairs it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--check', action='store_true', help="Only report the cars out of date, don't fix them.")
+
+    def handle(self, **options):
+        def progress(last, wrong):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'up to id {last}: {wrong} out of date')
+
+        wrong = availability.repair(options['batch_size'], fix=not options['check'], progress=progress)
+        for state, count in sorted(wrong.items()):
+            self.stdout.write(f'{count} cars should be {state}')
+        total = sum(wrong.values())
+        if total and options['check']:
+            raise CommandError(f'{total} cars out of date, run without --check to repair them')
+        elif total:
+            self.stdout.write(self.style.SUCCESS(f'{total} cars repaired'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Car states are consistent'))
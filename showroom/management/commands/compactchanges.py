@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from showroom import changes
+from showroom.utils import CHANGES_TOMBSTONE_DAYS, IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Compacts the change log to the last change of every object, and drops deletions older '
+            'than --tombstone-days. Feed consumers further behind than that get a 410 and resync.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tombstone-days', type=int, default=CHANGES_TOMBSTONE_DAYS)
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, **options):
+        removed = changes.compact(options['tombstone_days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{removed} changes removed, floor is now {changes.floor()}'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from showroom.dataset import SIZES, Generator
+from showroom.utils import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Generates a seeded synthetic showroom dataset of the given number of orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('size', help=f'Number of orders, or one of {", ".join(SIZES)}.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, size, **options):
+        try:
+            orders = SIZES[size.lower()] if size.lower() in SIZES else int(size)
+        except ValueError:
+            raise CommandError(f'Invalid size: {size}')
+
+        def progress(model, count):
+            self.stdout.write(f'{count} {model._meta.verbose_name_plural}')
+
+        start = time.monotonic()
+        Generator(orders, seed=options['seed'], batch_size=options['batch_size'], progress=progress).run()
+        self.stdout.write(self.style.SUCCESS(f'Generated {orders} orders in {time.monotonic() - start:.1f}s'))
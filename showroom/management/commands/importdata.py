@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from showroom.importing import IMPORTERS, read_rows
+from showroom.utils import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports manufacturers, employees, cars or orders from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'ndjson'),
+                            help='Input format, guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--on-conflict', choices=('skip', 'fail'), default='skip',
+                            help='What to do with rows clashing on a unique column.')
+
+    def handle(self, kind, path, **options):
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        importer = IMPORTERS[kind](batch_size=options['batch_size'], on_conflict=options['on_conflict'])
+
+        def progress(read, rate):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{read} rows, {rate:.0f} rows/s')
+
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                read, rate = importer.run(read_rows(stream, fmt), progress)
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, message in importer.errors:
+            self.stderr.write(f'line {line}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{importer.created} {kind} imported from {read} rows at {rate:.0f} rows/s, '
+            f'{importer.conflicts} conflicting and {importer.invalid} invalid rows skipped'))
@@ -0,0 +1,57 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from showroom import repricing
+from showroom.utils import REPRICE_CHUNK_SIZE, REPRICE_DIFFS_MAX
+
+
+class Command(BaseCommand):
+    help = ('Reprices cars and facilities with the rules of a JSON file, a list such as '
+            '[{"target": "car", "where": {"manufacturer__country": "DE"}, "percent": 5}], '
+            'one committed chunk of cars at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('rules', help='JSON file with the list of rules.')
+        parser.add_argument('--dry-run', action='store_true', help='Run every chunk and roll it back.')
+        parser.add_argument('--chunk-size', type=int, default=REPRICE_CHUNK_SIZE)
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes running car chunks.')
+        parser.add_argument('--diff', help='Write every price change as CSV to this file.')
+        parser.add_argument('--after', type=int, help='Only reprice cars above this id, skipping facility rules.')
+        parser.add_argument('--until', type=int, help='Only reprice cars up to this id, skipping facility rules.')
+
+    def handle(self, **options):
+        try:
+            with open(options['rules']) as f:
+                rules = repricing.parse(json.load(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        def progress(done, total, report):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'chunk {done}/{total}: {report.matched["car"]} cars matched')
+
+        try:
+            report = repricing.run(rules, options['dry_run'], options['chunk_size'], options['processes'], progress,
+                                   options['after'], options['until'])
+        except repricing.Interrupted as e:
+            reruns = '; '.join(f'--after {after} --until {until}' for after, until in e.pending)
+            raise CommandError(f'{e.__cause__}. Cars with ids in {e} were not repriced, rerun with {reruns}')
+        summary = report.summary(REPRICE_DIFFS_MAX)
+        if options['diff']:
+            with open(options['diff'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('target', 'id', 'old', 'new'))
+                writer.writerows(report.diffs)
+        elif options['dry_run']:
+            for diff in summary['diffs']:
+                self.stdout.write('{target} {id}: {old} -> {new}'.format(**diff))
+
+        for target, totals in summary['totals'].items():
+            self.stdout.write(f'{target}: {totals["matched"]} matched, {totals["changed"]} changed, '
+                              f'{totals["increase"]:+} in total')
+        if report.cars_touched:
+            self.stdout.write(f'{report.cars_touched} cars carry a repriced facility')
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(f'{len(report.diffs)} prices {verb}'))
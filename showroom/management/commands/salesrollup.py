@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from showroom import rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily sales rollup or checks it against the orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('rebuild', 'check'))
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to check, YYYY-MM-DD.')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to check, YYYY-MM-DD.')
+        parser.add_argument('--fix', action='store_true', help='Recompute the days the check finds out of date.')
+
+    def handle(self, action, **options):
+        if action == 'rebuild':
+            def progress(month, rows):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{month:%Y-%m}: {rows} rows')
+
+            rollup.rebuild(progress)
+            self.stdout.write(self.style.SUCCESS('Daily sales rollup rebuilt'))
+            return
+
+        days = list(rollup.mismatched_days(options['since'], options['until']))
+        for day in days:
+            self.stdout.write(f'{day} out of date')
+        if days and options['fix']:
+            rollup.refresh(days)
+            self.stdout.write(self.style.SUCCESS(f'{len(days)} days recomputed'))
+        elif days:
+            raise CommandError(f'{len(days)} days out of date, run with --fix to recompute them')
+        else:
+            self.stdout.write(self.style.SUCCESS('Daily sales rollup is consistent'))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from showroom.slowqueries import group_by_shape, read_log
+
+
+class Command(BaseCommand):
+    help = 'Reports logged slow queries grouped by their normalized shape, ranked by total time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(settings.SHOWROOM_SLOW_QUERY_LOG),
+                            help='Slow query log to read, rotated backups included.')
+        parser.add_argument('--limit', type=int, default=10, help='Number of shapes to report.')
+        parser.add_argument('--view', help='Only report queries run by this view name.')
+        parser.add_argument('--explain', action='store_true', help='Show the plan and stack of the slowest sample.')
+
+    def handle(self, **options):
+        records = read_log(options['log'])
+        if options['view']:
+            records = (r for r in records if r['view'] == options['view'])
+        shapes = group_by_shape(records)
+        if not shapes:
+            self.stdout.write('No slow queries logged.')
+            return
+
+        for rank, shape in enumerate(shapes[:options['limit']], 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank}  total {shape.total:.3f}s  {shape.count}x  mean {shape.mean * 1000:.1f}ms  '
+                f'max {shape.slowest["duration"] * 1000:.1f}ms'))
+            self.stdout.write(f'  views: {", ".join(sorted(shape.views)) or "-"}')
+            self.stdout.write(f'  {shape.shape}')
+            if options['explain']:
+                slowest = shape.slowest
+                self.stdout.write(f'  slowest at {slowest["time"]} on {slowest["path"] or "-"}, params {slowest["params"]}')
+                for frame in slowest['stack']:
+                    self.stdout.write(f'    {frame}')
+                for row in slowest['explain'] or ():
+                    self.stdout.write(f'    | {" | ".join(str(v) for v in row)}')
+        self.stdout.write(f'{len(shapes)} shapes, {sum(s.count for s in shapes)} slow queries')
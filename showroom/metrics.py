@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+from showroom.utils import METRICS_BUCKETS
+
+_state = Local()
+
+
+class RequestMetrics:
+    """Timings of one sampled request. Doubles as the execute wrapper that times its SQL."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - start
+
+    def header(self, total):
+        return ', '.join((
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.sql * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ))
+
+
+def current():
+    return getattr(_state, 'metrics', None)
+
+
+def record_cache(hit):
+    """Counts a cache lookup against the current request, if it is being sampled."""
+    metrics = current()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+class Histogram:
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        total = 0
+        for le, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{le}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {total}'
+
+
+class ViewStats:
+    def __init__(self):
+        self.duration = Histogram()
+        self.sql = Histogram()
+        self.template = Histogram()
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+HISTOGRAMS = (
+    ('showroom_request_duration_seconds', 'duration', 'Time spent handling the request.'),
+    ('showroom_request_sql_seconds', 'sql', 'Time spent in SQL queries per request.'),
+    ('showroom_request_template_seconds', 'template', 'Time spent rendering templates per request.'),
+)
+COUNTERS = (
+    ('showroom_queries_total', 'queries', 'SQL queries run.'),
+    ('showroom_cache_hits_total', 'cache_hits', 'Query and user cache hits.'),
+    ('showroom_cache_misses_total', 'cache_misses', 'Query and user cache misses.'),
+)
+
+
+class Registry:
+    """
+    Per-process aggregates of sampled requests, keyed by view name.
+    Each worker process exports its own, the way a Prometheus client
+    library does without a shared multiprocess store.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, metrics, total):
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = ViewStats()
+            stats.duration.observe(total)
+            stats.sql.observe(metrics.sql)
+            stats.template.observe(metrics.template)
+            stats.queries += metrics.queries
+            stats.cache_hits += metrics.cache_hits
+            stats.cache_misses += metrics.cache_misses
+
+    def render(self):
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP showroom_metrics_sample_rate Fraction of requests that are measured.',
+                '# TYPE showroom_metrics_sample_rate gauge',
+                f'showroom_metrics_sample_rate {settings.SHOWROOM_METRICS_SAMPLE_RATE}',
+            ]
+            for name, attr, help_text in HISTOGRAMS:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for view, stats in views:
+                    lines += getattr(stats, attr).render(name, f'view="{view}"')
+            for name, attr, help_text in COUNTERS:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                lines += [f'{name}{{view="{view}"}} {getattr(stats, attr)}' for view, stats in views]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """
+    Measures a SHOWROOM_METRICS_SAMPLE_RATE fraction of requests: total, SQL and
+    template time, query count and cache hits. Sampled responses get a
+    Server-Timing header and are aggregated into `registry` by view name.
+    Streaming responses are measured until their headers are ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SHOWROOM_METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        metrics = _state.metrics = RequestMetrics()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        registry.observe(match.view_name if match else '<unmatched>', metrics, total)
+        response['Server-Timing'] = metrics.header(total)
+        return response
+
+
+class TimedTemplate:
+    """Wraps a backend template to add its render time to the current request's metrics."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time; includes count towards their parent."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def export(request):
+    if request.META.get('REMOTE_ADDR') not in settings.SHOWROOM_METRICS_ALLOWED_IPS:
+        raise PermissionDenied()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,72 @@
+# Generated by Django 3.1.7 on 2026-10-18 06:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def copy_facilities(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Car = apps.get_model('showroom', 'Car')
+    CarFacility = apps.get_model('showroom', 'CarFacility')
+    cars = Car.objects.using(db).order_by('id').values_list('id', 'facility_1', 'facility_2', 'facility_3')
+    last = 0
+    while True:
+        batch = list(cars.filter(id__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        links = {(car, facility) for car, *facilities in batch for facility in facilities if facility is not None}
+        CarFacility.objects.using(db).bulk_create([CarFacility(car_id=car, facility_id=facility) for car, facility in links])
+        last = batch[-1][0]
+
+
+def restore_facilities(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Car = apps.get_model('showroom', 'Car')
+    CarFacility = apps.get_model('showroom', 'CarFacility')
+    facilities = {}
+    for car, facility in CarFacility.objects.using(db).order_by('car', 'id').values_list('car', 'facility'):
+        facilities.setdefault(car, []).append(facility)
+    for car, ids in facilities.items():
+        Car.objects.using(db).filter(id=car).update(**{f'facility_{i}': f for i, f in enumerate(ids[:3], 1)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarFacility',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='showroom.car')),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='showroom.facility')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='carfacility',
+            constraint=models.UniqueConstraint(fields=('facility', 'car'), name='showroom_carfacility_facility_car'),
+        ),
+        migrations.RunPython(copy_facilities, restore_facilities),
+        migrations.RemoveField(
+            model_name='car',
+            name='facility_1',
+        ),
+        migrations.RemoveField(
+            model_name='car',
+            name='facility_2',
+        ),
+        migrations.RemoveField(
+            model_name='car',
+            name='facility_3',
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='facilities',
+            field=models.ManyToManyField(blank=True, related_name='cars', through='showroom.CarFacility', to='showroom.Facility'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE showroom_carsearch USING fts5(document, tokenize='unicode61')",
+        "INSERT INTO showroom_carsearch (rowid, document) "
+        "SELECT c.id, c.brand || ' ' || c.color || ' ' || c.specifications || ' ' || m.name "
+        "FROM showroom_car c INNER JOIN showroom_manufacturer m ON c.manufacturer_id = m.id",
+    ],
+    'mysql': [
+        "CREATE TABLE showroom_carsearch (car_id integer NOT NULL PRIMARY KEY, document longtext NOT NULL, "
+        "FULLTEXT KEY showroom_carsearch_document (document)) ENGINE=InnoDB",
+        "INSERT INTO showroom_carsearch (car_id, document) "
+        "SELECT c.id, CONCAT_WS(' ', c.brand, c.color, c.specifications, m.name) "
+        "FROM showroom_car c INNER JOIN showroom_manufacturer m ON c.manufacturer_id = m.id",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE[schema_editor.connection.vendor]:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE showroom_carsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0008_car_facilities'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.7 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0009_car_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['brand'], name='showroom_car_brand'),
+        ),
+        migrations.AddIndex(
+            model_name='fullname',
+            index=models.Index(fields=['surname', 'first_name'], name='showroom_fullname_surname'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['is_paid', 'date_ordered'], name='showroom_order_paid_ordered'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.1.7 on 2026-10-18 07:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+
+
+def populate_daily_sales(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Order = apps.get_model('showroom', 'Order')
+    DailySales = apps.get_model('showroom', 'DailySales')
+    paid = Q(is_paid=True)
+    years = Order.objects.using(db).dates('date_ordered', 'year')
+    for year in years:
+        rows = Order.objects.using(db).filter(date_ordered__year=year.year).values(
+            'date_ordered', 'car__manufacturer', 'car__body_type', 'employee').annotate(
+            n=Count('id'), revenue=Sum('car__price'), n_paid=Count('id', filter=paid),
+            paid_revenue=Sum('car__price', filter=paid), prepay_sum=Sum('prepay_percent')).order_by()
+        DailySales.objects.using(db).bulk_create([
+            DailySales(day=r['date_ordered'], manufacturer_id=r['car__manufacturer'],
+                       body_type_id=r['car__body_type'], employee_id=r['employee'], orders=r['n'],
+                       revenue=r['revenue'], paid=r['n_paid'], paid_revenue=r['paid_revenue'] or 0,
+                       prepay_sum=r['prepay_sum'])
+            for r in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0010_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('paid', models.IntegerField(default=0)),
+                ('paid_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('prepay_sum', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date_ordered'], name='showroom_order_date_ordered'),
+        ),
+        migrations.AddField(
+            model_name='dailysales',
+            name='body_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='showroom.bodytype'),
+        ),
+        migrations.AddField(
+            model_name='dailysales',
+            name='employee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='showroom.employee'),
+        ),
+        migrations.AddField(
+            model_name='dailysales',
+            name='manufacturer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='showroom.manufacturer'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('day', 'manufacturer', 'body_type', 'employee'), name='showroom_dailysales_key'),
+        ),
+        migrations.RunPython(populate_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.1.7 on 2026-10-18 07:05
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def snapshot_prices(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Car = apps.get_model('showroom', 'Car')
+    Order = apps.get_model('showroom', 'Order')
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    sale_price = Car.objects.using(db).filter(pk=OuterRef('car_id')).annotate(sale_price=models.ExpressionWrapper(
+        F('price') + Coalesce(Sum('facilities__price'), Value(0), output_field=price), output_field=price,
+    )).values('sale_price')
+    last = Order.objects.using(db).aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last, BATCH_SIZE):
+        Order.objects.using(db).filter(id__gt=start, id__lte=start + BATCH_SIZE).update(price=Subquery(sale_price))
+
+
+def roll_up_prices(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Order = apps.get_model('showroom', 'Order')
+    DailySales = apps.get_model('showroom', 'DailySales')
+    paid = Q(is_paid=True)
+    DailySales.objects.using(db).all().delete()
+    for year in Order.objects.using(db).dates('date_ordered', 'year'):
+        rows = Order.objects.using(db).filter(date_ordered__year=year.year).values(
+            'date_ordered', 'car__manufacturer', 'car__body_type', 'employee').annotate(
+            n=Count('id'), revenue=Sum('price'), n_paid=Count('id', filter=paid),
+            paid_revenue=Sum('price', filter=paid), prepay_sum=Sum('prepay_percent')).order_by()
+        DailySales.objects.using(db).bulk_create([
+            DailySales(day=r['date_ordered'], manufacturer_id=r['car__manufacturer'],
+                       body_type_id=r['car__body_type'], employee_id=r['employee'], orders=r['n'],
+                       revenue=r['revenue'], paid=r['n_paid'], paid_revenue=r['paid_revenue'] or 0,
+                       prepay_sum=r['prepay_sum'])
+            for r in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0011_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(roll_up_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date_sold', 'is_paid', 'price'], name='showroom_order_sold_paid_price'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.7 on 2026-10-18 07:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0012_order_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='reserved_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='showroom.employee'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
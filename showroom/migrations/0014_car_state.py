@@ -0,0 +1,46 @@
+# Generated by Django 3.1.7 on 2026-10-18 07:10
+
+from django.db import migrations, models
+from django.db.models import Case, Exists, Max, OuterRef, Value, When
+
+BATCH_SIZE = 5000
+
+
+def compute_states(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Car = apps.get_model('showroom', 'Car')
+    Order = apps.get_model('showroom', 'Order')
+    orders = Order.objects.using(db).filter(car=OuterRef('pk'))
+    state = Case(
+        When(Exists(orders.filter(is_paid=True)), then=Value('sold')),
+        When(Exists(orders), then=Value('reserved')),
+        default=Value('available'),
+        output_field=models.CharField(),
+    )
+    last = Car.objects.using(db).aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last, BATCH_SIZE):
+        Car.objects.using(db).filter(id__gt=start, id__lte=start + BATCH_SIZE).update(state=state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0013_car_placement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='state',
+            field=models.CharField(choices=[('available', 'Available'), ('reserved', 'Reserved'), ('sold', 'Sold')], default='available', max_length=20),
+        ),
+        migrations.RunPython(compute_states, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['state', 'price', 'id'], name='showroom_car_state_price'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['state', 'id'], name='showroom_car_state_id'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.7 on 2026-10-18 07:13
+
+import datetime
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showroom', '0014_car_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(blank=True, max_length=100, null=True)),
+                ('phone', models.IntegerField(verbose_name=models.IntegerField(validators=[django.core.validators.MaxValueValidator(1000000000000), django.core.validators.MinValueValidator(0)]))),
+                ('passport', models.IntegerField(validators=[django.core.validators.MaxValueValidator(1000000000000), django.core.validators.MinValueValidator(0)])),
+                ('date_ordered', models.DateField(default=datetime.date.today)),
+                ('date_sold', models.DateField(default=datetime.date.today)),
+                ('is_processed', models.BooleanField(default=False)),
+                ('is_paid', models.BooleanField(default=False)),
+                ('prepay_percent', models.IntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100), django.core.validators.MinValueValidator(0)])),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='showroom.car')),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='showroom.employee')),
+                ('fullname', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='showroom.fullname')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['date_ordered'], name='showroom_archive_ordered'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['date_sold'], name='showroom_archive_sold'),
+        ),
+    ]
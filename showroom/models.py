@@ -1,15 +1,39 @@
 from datetime import date
 
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from showroom.utils import CHAR_FIELD_DEFAULT_SIZE_M, CHAR_FIELD_DEFAULT_SIZE_L, CHAR_FIELD_DEFAULT_SIZE_S
 
 
+class TrackedModel(models.Model):
+    """
+    Saves in a transaction, so what the post_save receivers write (the change
+    log, the rollup, car states) commits or rolls back together with the row.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
 class Fullname(models.Model):
     first_name = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
     second_name = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M, blank=True, null=True)
     surname = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['surname', 'first_name'], name='showroom_fullname_surname'),
+        ]
 
     def __str__(self):
         return ' '.join((self.first_name, self.surname))
@@ -22,12 +46,13 @@ class Position(models.Model):
     ])
     responsibilities = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
     requirements = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
-class Employee(models.Model):
+class Employee(TrackedModel):
     SEXES = (
         ('M', 'Male'),
         ('F', 'Female')
@@ -45,12 +70,13 @@ class Employee(models.Model):
         MaxValueValidator(1000000000000),
         MinValueValidator(0)
     ])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f'{self.fullname}, {self.position}'
 
 
-class Manufacturer(models.Model):
+class Manufacturer(TrackedModel):
     COUNTRIES = (('AW', 'Aruba'), ('AF', 'Afghanistan'), ('AO', 'Angola'), ('AI', 'Anguilla'), ('AX', 'Åland Islands'),
                  ('AL', 'Albania'), ('AD', 'Andorra'), ('AE', 'United Arab Emirates'), ('AR', 'Argentina'),
                  ('AM', 'Armenia'), ('AS', 'American Samoa'), ('AQ', 'Antarctica'),
@@ -115,12 +141,14 @@ class Manufacturer(models.Model):
                  ('VG', 'Virgin Islands, British'), ('VI', 'Virgin Islands, U.S.'), ('VN', 'Viet Nam'),
                  ('VU', 'Vanuatu'), ('WF', 'Wallis and Futuna'), ('WS', 'Samoa'), ('YE', 'Yemen'),
                  ('ZA', 'South Africa'), ('ZM', 'Zambia'), ('ZW', 'Zimbabwe'))
+    COUNTRY_NAMES = dict(COUNTRIES)
 
     employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, blank=True, null=True)
 
     name = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M, unique=True)
     address = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
     country = models.CharField(max_length=2, choices=COUNTRIES)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -132,6 +160,7 @@ class Facility(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[
         MinValueValidator(1)
     ])
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -140,21 +169,47 @@ class Facility(models.Model):
 class BodyType(models.Model):
     name = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M, unique=True)
     description = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_L)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
-class Car(models.Model):
+class CarUnavailable(ValueError):
+    pass
+
+
+class CarQuerySet(models.QuerySet):
+    def on_sale_to(self, employee_id, now=None):
+        """The available cars not held by another employee. Reservations expire by their timestamp alone."""
+        now = now or timezone.now()
+        free = Q(reserved_until__isnull=True) | Q(reserved_until__lte=now)
+        return self.filter(free | Q(reserved_by=employee_id) if employee_id is not None else free,
+                           state=self.model.AVAILABLE)
+
+    def claim(self, employee_id, now=None):
+        """Takes the cars on sale to the employee off the shelf for an order, returns how many it took."""
+        return self.on_sale_to(employee_id, now).update(version=F('version') + 1, reserved_by=None, reserved_until=None)
+
+    def with_sale_price(self):
+        """Annotates `sale_price`, the car's price plus the prices of its facilities."""
+        price = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(sale_price=models.ExpressionWrapper(
+            F('price') + Coalesce(Sum('facilities__price'), Value(0), output_field=price), output_field=price))
+
+
+class Car(TrackedModel):
+    AVAILABLE, RESERVED, SOLD = 'available', 'reserved', 'sold'
+    STATES = (
+        (AVAILABLE, 'Available'),
+        (RESERVED, 'Reserved'),
+        (SOLD, 'Sold'),
+    )
+
     manufacturer = models.ForeignKey(Manufacturer, on_delete=models.CASCADE)
     body_type = models.ForeignKey(BodyType, on_delete=models.CASCADE)
     employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, blank=True, null=True)
-    facility_1 = models.ForeignKey(
-        Facility, related_name='car_facility_1', on_delete=models.SET_NULL, blank=True, null=True)
-    facility_2 = models.ForeignKey(
-        Facility, related_name='car_facility_2', on_delete=models.SET_NULL, blank=True, null=True)
-    facility_3 = models.ForeignKey(
-        Facility, related_name='car_facility_3', on_delete=models.SET_NULL, blank=True, null=True)
+    facilities = models.ManyToManyField(Facility, through='CarFacility', related_name='cars', blank=True)
 
     brand = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_M)
     date_produced = models.DateField(default=date.today)
@@ -169,12 +224,52 @@ class Car(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[
         MinValueValidator(1)
     ])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Written only by conditional UPDATEs: CarQuerySet.claim, showroom.placement and showroom.availability, see save()
+    state = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_S, choices=STATES, default=AVAILABLE)
+    version = models.PositiveIntegerField(default=0)
+    reserved_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, blank=True, null=True,
+                                    related_name='reservations')
+    reserved_until = models.DateTimeField(blank=True, null=True)
+
+    PLACEMENT_FIELDS = ('state', 'version', 'reserved_by', 'reserved_until')
+
+    objects = CarQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['brand'], name='showroom_car_brand'),
+            # The /cars/ page order and the API's id order of one state, without touching the orders.
+            models.Index(fields=['state', 'price', 'id'], name='showroom_car_state_price'),
+            models.Index(fields=['state', 'id'], name='showroom_car_state_id'),
+        ]
 
     def __str__(self):
         return f'{self.manufacturer}, {self.brand}, {self.color}'
 
+    def save(self, *args, **kwargs):
+        # A car loaded before a reservation or sale must not write its stale version back.
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [f.name for f in self._meta.concrete_fields
+                                       if not f.primary_key and f.name not in self.PLACEMENT_FIELDS]
+        super().save(*args, **kwargs)
 
-class Order(models.Model):
+
+class CarFacility(models.Model):
+    car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    facility = models.ForeignKey(Facility, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facility', 'car'], name='showroom_carfacility_facility_car'),
+        ]
+
+    def __str__(self):
+        return f'{self.car}: {self.facility}'
+
+
+class BaseOrder(TrackedModel):
     fullname = models.ForeignKey(Fullname, on_delete=models.CASCADE)
     car = models.ForeignKey(Car, on_delete=models.CASCADE)
     employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, blank=True, null=True)
@@ -199,6 +294,115 @@ class Order(models.Model):
             MinValueValidator(0)
         ]
     )
+    price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, validators=[
+        MinValueValidator(0)
+    ])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        abstract = True
 
     def __str__(self):
         return f'{self.fullname}: {self.car}'
+
+
+class Order(BaseOrder):
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_paid', 'date_ordered'], name='showroom_order_paid_ordered'),
+            models.Index(fields=['date_ordered'], name='showroom_order_date_ordered'),
+            models.Index(fields=['date_sold', 'is_paid', 'price'], name='showroom_order_sold_paid_price'),
+        ]
+
+    def _takes_car(self, update_fields=None):
+        # A new order, or one moved to another car, takes its car; other edits leave the car alone.
+        if self._state.adding:
+            return True
+        if update_fields is not None and not {'car', 'car_id'} & set(update_fields):
+            return False
+        return Order.objects.filter(pk=self.pk).exclude(car=self.car_id).exists()
+
+    def clean(self):
+        super().clean()
+        if self.car_id is not None and self._takes_car() and not Car.objects.filter(
+                pk=self.car_id).on_sale_to(self.employee_id).exists():
+            raise ValidationError({'car': 'This car is sold or reserved for someone else.'})
+
+    def save(self, *args, car_claimed=False, **kwargs):
+        """
+        Claims the car in the transaction of the save, as showroom.placement.place_order
+        does, so no path can order a car that is sold or held by another employee.
+        `car_claimed` says the caller already did.
+        """
+        # The sale price is taken when the order is placed, later car price changes don't rewrite it.
+        if self.price is None:
+            self.price = Car.objects.filter(pk=self.car_id).with_sale_price().values_list(
+                'sale_price', flat=True).get()
+        with transaction.atomic():
+            if not car_claimed and self._takes_car(kwargs.get('update_fields')) and not Car.objects.filter(
+                    pk=self.car_id).claim(self.employee_id):
+                raise CarUnavailable(f'Car {self.car_id} is not available')
+            super().save(*args, **kwargs)
+
+
+class ArchivedOrder(BaseOrder):
+    """Processed and paid orders moved out of Order by showroom.archive, columns and ids unchanged."""
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_ordered'], name='showroom_archive_ordered'),
+            models.Index(fields=['date_sold'], name='showroom_archive_sold'),
+        ]
+
+
+class DailySales(models.Model):
+    """Orders rolled up per day ordered, manufacturer, body type and employee, maintained by showroom.rollup."""
+    day = models.DateField()
+    manufacturer = models.ForeignKey(Manufacturer, on_delete=models.CASCADE, related_name='+')
+    body_type = models.ForeignKey(BodyType, on_delete=models.CASCADE, related_name='+')
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    paid = models.IntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    prepay_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'manufacturer', 'body_type', 'employee'],
+                                    name='showroom_dailysales_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}: {self.orders} orders'
+
+
+class ChangeLog(models.Model):
+    """
+    One row per save or delete of a tracked model, written by showroom.changes
+    in the same transaction. The id is the change sequence the feed pages by.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=CHAR_FIELD_DEFAULT_SIZE_S)
+    object_id = models.IntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='showroom_changelog_object'),
+        ]
+
+    def __str__(self):
+        return f'{self.id}: {self.model} {self.object_id}{" deleted" if self.deleted else ""}'
+
+
+class ChangeLogCompaction(models.Model):
+    """A compaction run; change feed cursors below the highest floor missed purged deletions."""
+    floor = models.BigIntegerField()
+    removed = models.IntegerField()
+    compacted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.compacted_at}: {self.removed} removed, floor {self.floor}'
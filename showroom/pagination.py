@@ -0,0 +1,143 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from showroom.utils import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+PAGINATION_PARAMS = ('after', 'before', 'limit')
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(v) for v in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Malformed cursor') from e
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError('Malformed cursor')
+    try:
+        return [f.to_python(v) for f, v in zip(fields, values)]
+    except ValidationError as e:
+        raise ValueError('Malformed cursor') from e
+
+
+def is_paginated(query):
+    return any(p in query for p in PAGINATION_PARAMS)
+
+
+def split_params(query):
+    """Separates pagination params from filter params of a GET QueryDict."""
+    filters = {k: v for k, v in query.items() if k not in PAGINATION_PARAMS}
+    paging = {k: query[k] for k in PAGINATION_PARAMS if k in query}
+    return filters, paging
+
+
+def cursor_query(query, **cursor):
+    q = query.copy()
+    for p in ('after', 'before'):
+        q.pop(p, None)
+    q.update(cursor)
+    return q.urlencode()
+
+
+class Page:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_query = None
+        self.previous_query = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def link(self, query):
+        """Builds the next/previous querystrings, keeping the other params of `query`."""
+        if self.next_cursor:
+            self.next_query = cursor_query(query, after=self.next_cursor)
+        if self.previous_cursor:
+            self.previous_query = cursor_query(query, before=self.previous_cursor)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by a unique, ordered key instead of OFFSET,
+    so that every page costs the same index range scan.
+    The last key must be unique (usually 'id').
+    """
+
+    def __init__(self, queryset, keys, page_size=PAGE_SIZE_DEFAULT):
+        self.queryset = queryset
+        self.keys = keys
+        self.page_size = max(1, min(int(page_size), PAGE_SIZE_MAX))
+        self.fields = [self._resolve_field(k) for k in keys]
+
+    def _resolve_field(self, key):
+        model = self.queryset.model
+        *path, name = key.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(name)
+
+    def _key_values(self, obj):
+        values = []
+        for key in self.keys:
+            value = obj
+            for part in key.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _seek(self, values, lookup):
+        conditions = []
+        for i, key in enumerate(self.keys):
+            equal = {k: v for k, v in zip(self.keys[:i], values[:i])}
+            conditions.append(Q(**equal, **{f'{key}__{lookup}': values[i]}))
+        return reduce(or_, conditions)
+
+    def page(self, after=None, before=None):
+        if after and before:
+            raise ValueError('Only one of after/before may be given')
+        backwards = bool(before)
+        order = [f'-{k}' if backwards else k for k in self.keys]
+        qs = self.queryset.order_by(*order)
+        if after:
+            qs = qs.filter(self._seek(decode_cursor(after, self.fields), 'gt'))
+        elif before:
+            qs = qs.filter(self._seek(decode_cursor(before, self.fields), 'lt'))
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return Page(rows)
+
+        first, last = encode_cursor(self._key_values(rows[0])), encode_cursor(self._key_values(rows[-1]))
+        if backwards:
+            return Page(rows, next_cursor=last, previous_cursor=first if has_more else None)
+        return Page(rows, next_cursor=last if has_more else None, previous_cursor=first if after else None)
+
+
+def paginate(query, queryset, keys):
+    """Returns a keyset Page for the GET QueryDict, or None if pagination wasn't requested."""
+    if not is_paginated(query):
+        return None
+    _, paging = split_params(query)
+    paginator = KeysetPaginator(queryset, keys, paging.get('limit', PAGE_SIZE_DEFAULT))
+    page = paginator.page(after=paging.get('after'), before=paging.get('before'))
+    page.link(query)
+    return page
@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from showroom.models import Car, CarUnavailable, Order
+from showroom.utils import PLACEMENT_BACKOFF, PLACEMENT_RETRIES, RESERVATION_SECONDS
+
+
+class PlacementConflict(Exception):
+    """The car kept changing under us for PLACEMENT_RETRIES attempts."""
+
+
+def _unavailable(car_id, employee_id):
+    car = Car.objects.filter(pk=car_id).values('state', 'reserved_by', 'reserved_until').first()
+    if car is None:
+        raise Car.DoesNotExist(f'Car {car_id} does not exist')
+    if car['state'] != Car.AVAILABLE:
+        return CarUnavailable(f'Car {car_id} is {car["state"]}')
+    if car['reserved_until'] and car['reserved_until'] > timezone.now() and car['reserved_by'] != employee_id:
+        return CarUnavailable(f'Car {car_id} is reserved until {car["reserved_until"]:%H:%M:%S}')
+    return None
+
+
+def reserve(car_id, employee_id, seconds=RESERVATION_SECONDS):
+    """
+    Holds an available car for the employee for the given number of seconds and
+    returns when the hold ends. Reserving again extends the employee's own hold.
+    """
+    if employee_id is None:
+        raise ValueError('A reservation needs the employee holding the car')
+    now = timezone.now()
+    until = now + timedelta(seconds=seconds)
+    held = Car.objects.filter(pk=car_id).on_sale_to(employee_id, now).update(
+        version=F('version') + 1, reserved_by=employee_id, reserved_until=until)
+    if not held:
+        raise _unavailable(car_id, employee_id) or CarUnavailable(f'Car {car_id} is not available')
+    return until
+
+
+def release(car_id, employee_id):
+    return bool(Car.objects.filter(pk=car_id, reserved_by=employee_id).update(
+        version=F('version') + 1, reserved_by=None, reserved_until=None))
+
+
+def place_order(car_id, employee_id=None, retries=PLACEMENT_RETRIES, **fields):
+    """
+    Creates an Order for the car if it is available and not held by another employee.
+
+    The car row is claimed with an UPDATE conditional on the version read just
+    before it, in the same transaction as the INSERT of the order, whose
+    post_save moves the car out of the available state. Concurrent
+    placements for one car serialize on that row and all but one see the
+    version moved on. Placements for different cars don't wait for each other
+    on the car rows, but the order's post_save also adds it to its DailySales
+    row in the same transaction, so same-day sales of one manufacturer, body
+    type and employee, a single-model launch say, do serialize on that row;
+    `manage.py benchplacement` measures that as its launch mode.
+    A lost race is retried with jittered backoff up to `retries` times.
+    """
+    for attempt in range(retries + 1):
+        version = Car.objects.filter(pk=car_id).values_list('version', flat=True).first()
+        if version is None:
+            raise Car.DoesNotExist(f'Car {car_id} does not exist')
+        with transaction.atomic():
+            if Car.objects.filter(pk=car_id, version=version).claim(employee_id):
+                order = Order(car_id=car_id, employee_id=employee_id, **fields)
+                order.save(car_claimed=True)
+                return order
+        error = _unavailable(car_id, employee_id)
+        if error is not None:
+            raise error
+        time.sleep(random.uniform(0, PLACEMENT_BACKOFF * 2 ** attempt))
+    raise PlacementConflict(f'Car {car_id} changed {retries + 1} times while placing the order')
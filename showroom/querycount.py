@@ -0,0 +1,109 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Reduces a SQL statement to its shape, so that the same query with different params compares equal."""
+    return _LITERAL.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryRecorder:
+    """Database execute wrapper that records every query run through it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context['connection'].alias, sql, time.perf_counter() - start))
+
+    def __len__(self):
+        return len(self.queries)
+
+    def shapes(self):
+        return Counter(normalize_sql(sql) for _, sql, _ in self.queries)
+
+    def repeated(self, threshold=None):
+        """Returns query shapes run at least `threshold` times, the usual signature of N+1 access."""
+        threshold = threshold or settings.SHOWROOM_N_PLUS_ONE_THRESHOLD
+        return {shape: n for shape, n in self.shapes().items() if n >= threshold}
+
+    def report(self):
+        lines = [f'{len(self)} queries']
+        lines += [f'  {n}x {shape}' for shape, n in self.shapes().most_common()]
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=None):
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def assert_query_budget(max_queries, allow_repeated=False):
+    """
+    Test helper: fails if the block runs more than `max_queries` queries
+    or, unless `allow_repeated`, repeats a query shape N+1 style.
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if len(recorder) > max_queries:
+        raise AssertionError(f'Query budget of {max_queries} exceeded\n{recorder.report()}')
+    if not allow_repeated and recorder.repeated():
+        raise AssertionError(f'Repeated queries detected\n{recorder.report()}')
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of each request and checks them against
+    SHOWROOM_QUERY_BUDGETS, keyed by URL name. Violations raise
+    QueryBudgetExceeded if SHOWROOM_QUERY_BUDGET_STRICT, otherwise they are logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if response.status_code < 400 and match is not None and match.url_name in settings.SHOWROOM_QUERY_BUDGETS:
+            self.check(request, match.url_name, recorder)
+        return response
+
+    def check(self, request, url_name, recorder):
+        budget = settings.SHOWROOM_QUERY_BUDGETS[url_name]
+        problems = []
+        if len(recorder) > budget:
+            problems.append(f'{len(recorder)} queries over a budget of {budget}')
+        if recorder.repeated():
+            problems.append('repeated query shapes (N+1)')
+        if not problems:
+            return
+        message = f'{request.path}: {", ".join(problems)}\n{recorder.report()}'
+        if settings.SHOWROOM_QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,140 @@
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from showroom.models import DailySales, Manufacturer
+
+GROUPINGS = {
+    'month': ('month',),
+    'manufacturer': ('car__manufacturer', 'car__manufacturer__name'),
+    'country': ('car__manufacturer__country',),
+    'body_type': ('car__body_type', 'car__body_type__name'),
+    'employee': ('employee', 'employee__fullname__first_name', 'employee__fullname__surname'),
+}
+
+
+# Order filter paths and groupings that DailySales can answer, with their names on it.
+ROLLUP_PATHS = {
+    'date_ordered': 'day',
+    'car__manufacturer': 'manufacturer',
+    'car__manufacturer__name': 'manufacturer__name',
+    'car__manufacturer__country': 'manufacturer__country',
+    'car__body_type': 'body_type',
+    'car__body_type__name': 'body_type__name',
+    'employee': 'employee',
+    'employee__fullname__first_name': 'employee__fullname__first_name',
+    'employee__fullname__surname': 'employee__fullname__surname',
+    'month': 'month',
+}
+
+
+SALES_MEASURES = ('orders', 'total', 'prepay', 'paid', 'paid_total', 'unpaid', 'unpaid_total')
+
+
+def order_totals(orders):
+    """Aggregates price totals of an Order queryset in the database."""
+    return orders.aggregate(
+        total=Sum('price'),
+        count=Count('id'),
+    )
+
+
+def _sales_rows(orders, group, keys):
+    if group == 'month':
+        orders = orders.annotate(month=TruncMonth('date_ordered'))
+    paid, unpaid = Q(is_paid=True), Q(is_paid=False)
+    # A group with no paid (or unpaid) orders sums to 0, as it does on the rollup.
+    price = DecimalField(max_digits=16, decimal_places=2)
+    return orders.values(*keys).annotate(
+        orders=Count('id'),
+        total=Sum('price'),
+        prepay=Sum('prepay_percent'),
+        paid=Count('id', filter=paid),
+        paid_total=Coalesce(Sum('price', filter=paid), Value(0), output_field=price),
+        unpaid=Count('id', filter=unpaid),
+        unpaid_total=Coalesce(Sum('price', filter=unpaid), Value(0), output_field=price),
+    ).order_by(*keys)
+
+
+def sales_report(orders, group):
+    """
+    Groups an Order queryset by one of GROUPINGS and aggregates every group
+    in a single GROUP BY query, one per table when `orders` reaches the archive.
+    """
+    if group not in GROUPINGS:
+        raise ValueError(f'Unknown grouping: {group}')
+    keys = GROUPINGS[group]
+    merged = {}
+    for part in getattr(orders, 'parts', [orders]):
+        for row in _sales_rows(part, group, keys):
+            key = tuple(row[k] for k in keys)
+            if key not in merged:
+                merged[key] = row
+                continue
+            for name in SALES_MEASURES:
+                merged[key][name] += row[name]
+    rows = [merged[key] for key in sorted(merged, key=lambda k: [(v is not None, v) for v in k])]
+    for row in rows:
+        row['avg_prepay'] = row.pop('prepay') / row['orders']
+    return [dict(row, label=_label(group, row)) for row in rows]
+
+
+def _label(group, row):
+    if group == 'month':
+        return row['month'].strftime('%Y-%m')
+    if group == 'manufacturer':
+        return row['car__manufacturer__name']
+    if group == 'country':
+        return Manufacturer.COUNTRY_NAMES.get(row['car__manufacturer__country'], row['car__manufacturer__country'])
+    if group == 'body_type':
+        return row['car__body_type__name']
+    if row['employee'] is None:
+        return '-'
+    return ' '.join((row['employee__fullname__first_name'], row['employee__fullname__surname']))
+
+
+def rollup_filters(kwargs):
+    """Translates Order filter kwargs to DailySales ones, or returns None if the rollup can't answer them."""
+    translated = {}
+    for key, value in kwargs.items():
+        path, _, lookup = key.rpartition('__')
+        if path not in ROLLUP_PATHS:
+            return None
+        translated[f'{ROLLUP_PATHS[path]}__{lookup}'] = value
+    return translated
+
+
+def rollup_sales_report(kwargs, group):
+    """
+    sales_report() for Order filter kwargs, read from the DailySales rollup.
+    Returns None if the filters need columns the rollup doesn't keep.
+    """
+    if group not in GROUPINGS:
+        raise ValueError(f'Unknown grouping: {group}')
+    filters = rollup_filters(kwargs)
+    if filters is None:
+        return None
+    rollup = DailySales.objects.filter(**filters)
+    if group == 'month':
+        rollup = rollup.annotate(month=TruncMonth('day'))
+    keys = GROUPINGS[group]
+    rows = rollup.values(*(ROLLUP_PATHS[k] for k in keys)).annotate(
+        n=Sum('orders'),
+        total=Sum('revenue'),
+        n_paid=Sum('paid'),
+        paid_total=Sum('paid_revenue'),
+        prepay=Sum('prepay_sum'),
+    ).order_by(*(ROLLUP_PATHS[k] for k in keys))
+    report = []
+    for r in rows:
+        row = {k: r[ROLLUP_PATHS[k]] for k in keys}
+        row.update(
+            orders=r['n'],
+            total=r['total'],
+            avg_prepay=r['prepay'] / r['n'],
+            paid=r['n_paid'],
+            paid_total=r['paid_total'],
+            unpaid=r['n'] - r['n_paid'],
+            unpaid_total=r['total'] - r['paid_total'],
+        )
+        report.append(dict(row, label=_label(group, row)))
+    return report
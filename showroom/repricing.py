@@ -0,0 +1,274 @@
+import multiprocessing
+from collections import Counter
+from decimal import ROUND_CEILING, ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import DecimalField, F, Max, Value
+from django.db.models.functions import Cast, Greatest, Round
+from django.utils import timezone
+
+from showroom import changes
+from showroom.cache import bump_generation
+from showroom.filters import CAR_FILTERS, FACILITY_FILTERS
+from showroom.models import ArchivedOrder, Car, CarFacility, Facility, Order
+from showroom.utils import REPRICE_CHUNK_SIZE
+
+PRICE = DecimalField(max_digits=10, decimal_places=2)
+# Percentages keep their digits until the new price is cast to PRICE: at two places 7.5% would apply as 8%.
+RATE = DecimalField(max_digits=20, decimal_places=10)
+CENT = Decimal('0.01')
+MIN_PRICE = Decimal('1.00')
+
+TARGETS = {
+    'car': (Car, CAR_FILTERS),
+    'facility': (Facility, FACILITY_FILTERS),
+}
+
+# Price operations a rule can apply in SQL, built from the current price and the rule's value.
+OPS = {
+    'percent': lambda price, value: price + price * Value(value, output_field=RATE) / Value(100, output_field=RATE),
+    'add': lambda price, value: price + Value(value, output_field=PRICE),
+    'set': lambda price, value: Value(value, output_field=PRICE),
+    'round': lambda price, value: Round(price / Value(value, output_field=PRICE)) * Value(value, output_field=PRICE),
+}
+
+
+def charm(price):
+    """Rounds up to the next whole hundred less one, 18420 becomes 18499."""
+    return (price / 100).to_integral_value(ROUND_CEILING) * 100 - 1
+
+
+# Rules SQL can't express; their rows are read, repriced in Python and written back with bulk_update.
+PYTHON_RULES = {
+    'charm': charm,
+}
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+class Interrupted(Exception):
+    """A chunk of cars failed twice. `pending` are the (after, until) id ranges left unrepriced, all else is done."""
+
+    def __init__(self, pending):
+        super().__init__(', '.join(f'({after}, {until}]' for after, until in pending))
+        self.pending = pending
+
+
+class Rule:
+    """One repricing step: the rows of `target` matching the `where` filters get a new price."""
+
+    def __init__(self, target, where, op, value):
+        self.model, schema = TARGETS[target]
+        self.target = target
+        self.kwargs = schema.compile(where)
+        self.op = op
+        self.value = value
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Builds a rule from a dict such as {"target": "car", "where": {"manufacturer__country": "DE"},
+        "percent": 5}. `where` takes the list filters of the target; exactly one of percent, add,
+        set, round or python says what happens to the price.
+        """
+        if not isinstance(spec, dict):
+            raise InvalidRule(f'Not a rule: {spec!r}')
+        target = spec.get('target', 'car')
+        if target not in TARGETS:
+            raise InvalidRule(f'Unknown target {target!r}')
+        where = spec.get('where', {})
+        if not isinstance(where, dict):
+            raise InvalidRule('where must be an object of filters')
+        ops = [k for k in spec if k in OPS or k == 'python']
+        if len(ops) != 1:
+            raise InvalidRule(f'A rule needs exactly one of {", ".join(OPS)} or python')
+        op = ops[0]
+        if op == 'python':
+            if spec[op] not in PYTHON_RULES:
+                raise InvalidRule(f'Unknown python rule {spec[op]!r}')
+            value = spec[op]
+        else:
+            try:
+                value = Decimal(str(spec[op]))
+            except InvalidOperation:
+                raise InvalidRule(f'{op}: not a number: {spec[op]!r}')
+            if not value.is_finite() or op == 'percent' and value <= -100 or op in ('set', 'round') and value <= 0:
+                raise InvalidRule(f'{op}: out of range: {value}')
+        return cls(target, {k: str(v) for k, v in where.items()}, op, value)
+
+    def apply(self, queryset, now):
+        """Reprices the rows of the queryset, writing only those whose price moves."""
+        if self.op == 'python':
+            function, changed = PYTHON_RULES[self.value], []
+            for row in queryset.only('id', 'price'):
+                price = max(function(row.price), MIN_PRICE).quantize(CENT, ROUND_HALF_UP)
+                if price != row.price:
+                    row.price, row.updated_at = price, now
+                    changed.append(row)
+            self.model.objects.bulk_update(changed, ['price', 'updated_at'])
+            return
+        price = Greatest(Cast(OPS[self.op](F('price'), self.value), PRICE), Cast(Value(MIN_PRICE), PRICE))
+        queryset.exclude(price=price).update(price=price, updated_at=now)
+
+
+def parse(specs):
+    if not isinstance(specs, list) or not specs:
+        raise InvalidRule('Rules must be a non-empty list')
+    rules = []
+    for i, spec in enumerate(specs):
+        try:
+            rules.append(Rule.parse(spec))
+        except ValueError as e:
+            raise InvalidRule(f'Rule {i + 1}: {e}') from e
+    return rules
+
+
+def _reprice(model, rules, rows, now):
+    """Applies the rules in order to a queryset of rows and returns (matched ids, [(id, old, new)])."""
+    before = {}
+    for rule in rules:
+        ids = set(rows.filter(**rule.kwargs).values_list('id', flat=True))
+        if not ids:
+            continue
+        before.update(model.objects.filter(id__in=ids - set(before)).values_list('id', 'price'))
+        rule.apply(model.objects.filter(id__in=ids), now)
+    after = dict(model.objects.filter(id__in=before).values_list('id', 'price'))
+    return set(before), [(pk, before[pk], after[pk]) for pk in sorted(before) if before[pk] != after[pk]]
+
+
+def reprice_cars(rules, start, stop, dry_run=False):
+    """
+    Applies the car rules to the cars with ids in (start, stop] in one short
+    transaction, rolled back on a dry run. Each rule is one UPDATE over the ids
+    it matches, so only the rows of the chunk are locked, and only for as long
+    as the chunk takes.
+    """
+    with transaction.atomic():
+        matched, diffs = _reprice(Car, rules, Car.objects.filter(id__gt=start, id__lte=stop), timezone.now())
+        if dry_run:
+            transaction.set_rollback(True)
+        elif diffs:
+            ids = [pk for pk, _, _ in diffs]
+            changes.record(Car, ids)
+            # The order feed shows the car's price too.
+            for model in (Order, ArchivedOrder):
+                changes.touch(model, model.objects.filter(car__in=ids))
+            transaction.on_commit(lambda: bump_generation(Car))
+    return len(matched), diffs
+
+
+def _reprice_chunk(chunk):
+    # A failed chunk, a deadlock say, is handed back to be retried once the others are done.
+    try:
+        return (chunk,) + reprice_cars(*chunk)
+    except DatabaseError:
+        return chunk, None, None
+
+
+def touch_cars(facility_ids, chunk_size=REPRICE_CHUNK_SIZE):
+    """Marks the cars carrying the facilities as changed, their sale price moved with them. Returns their count."""
+    car_ids = sorted(set(CarFacility.objects.filter(facility__in=facility_ids).values_list('car', flat=True)))
+    for i in range(0, len(car_ids), chunk_size):
+        ids = car_ids[i:i + chunk_size]
+        with transaction.atomic():
+            Car.objects.filter(id__in=ids).update(updated_at=timezone.now())
+            changes.record(Car, ids)
+    return len(car_ids)
+
+
+class Report:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.matched = Counter()
+        self.diffs = []
+        self.cars_touched = 0
+
+    def add(self, target, matched, diffs):
+        self.matched[target] += matched
+        self.diffs.extend((target, pk, old, new) for pk, old, new in diffs)
+
+    def summary(self, limit):
+        totals = {target: dict(matched=self.matched[target], changed=0, increase=Decimal(0)) for target in TARGETS}
+        for target, _, old, new in self.diffs:
+            totals[target]['changed'] += 1
+            totals[target]['increase'] += new - old
+        return dict(
+            dry_run=self.dry_run,
+            totals=totals,
+            cars_touched=self.cars_touched,
+            diffs=[dict(target=target, id=pk, old=old, new=new) for target, pk, old, new in self.diffs[:limit]],
+        )
+
+
+def run(rules, dry_run=False, chunk_size=REPRICE_CHUNK_SIZE, processes=1, progress=None, after=None, until=None):
+    """
+    Applies parsed rules and returns a Report of the prices they changed.
+
+    Facility rules go first, in one transaction as the table is small; the
+    cars carrying a repriced facility are then touched, since their sale price
+    is their own price plus their facilities'. Car rules run in id chunks of
+    `chunk_size`, each committed on its own, spread over `processes` worker
+    processes if more than one. Rules apply in order within a chunk, so a
+    later rule sees the prices an earlier one set.
+
+    A chunk that fails is retried once at the end; failing again, it raises
+    Interrupted with the id ranges still to do, which a rerun limited to them
+    by `after` and `until` finishes. Either bound skips the facility rules.
+    """
+    report = Report(dry_run)
+    facility_rules = [r for r in rules if r.target == 'facility']
+    car_rules = [r for r in rules if r.target == 'car']
+    first = after or 0
+    last = (until or Car.objects.aggregate(last=Max('id'))['last'] or 0) if car_rules else first
+    chunks = [(car_rules, start, min(start + chunk_size, last), dry_run) for start in range(first, last, chunk_size)]
+    pending, failed = {chunk[1]: chunk for chunk in chunks}, []
+
+    if facility_rules and after is None and until is None:
+        with transaction.atomic():
+            matched, diffs = _reprice(Facility, facility_rules, Facility.objects.all(), timezone.now())
+            if dry_run:
+                transaction.set_rollback(True)
+        report.add('facility', len(matched), diffs)
+        facility_ids = [pk for pk, _, _ in diffs]
+        if dry_run:
+            carriers = CarFacility.objects.filter(facility__in=facility_ids)
+            report.cars_touched = carriers.values('car').distinct().count()
+        elif diffs:
+            report.cars_touched = touch_cars(facility_ids, chunk_size)
+            bump_generation(Facility)
+
+    def collect(results):
+        for chunk, matched, diffs in results:
+            if matched is None:
+                failed.append(chunk)
+                continue
+            report.add('car', matched, diffs)
+            del pending[chunk[1]]
+            if progress is not None:
+                progress(len(chunks) - len(pending), len(chunks), report)
+
+    if processes > 1 and len(chunks) > 1:
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            collect(pool.imap_unordered(_reprice_chunk, chunks))
+    else:
+        collect(map(_reprice_chunk, chunks))
+    for chunk in sorted(failed, key=lambda c: c[1]):
+        try:
+            collect([(chunk,) + reprice_cars(*chunk)])
+        except DatabaseError as e:
+            ranges = []
+            for _, start, stop, _ in sorted(pending.values(), key=lambda c: c[1]):
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], stop)
+                else:
+                    ranges.append((start, stop))
+            raise Interrupted(ranges) from e
+    report.diffs.sort(key=lambda d: (d[0], d[1]))
+
+    if not dry_run and (report.diffs or report.cars_touched):
+        bump_generation(Car)
+    return report
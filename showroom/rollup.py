@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from showroom.models import ArchivedOrder, DailySales, Order
+from showroom.utils import IMPORT_BATCH_SIZE, ROLLUP_DAYS_PER_QUERY
+
+KEY = ('day', 'manufacturer_id', 'body_type_id', 'employee_id')
+MEASURES = ('orders', 'revenue', 'paid', 'paid_revenue', 'prepay_sum')
+STATE = ('date_ordered', 'car__manufacturer', 'car__body_type', 'employee', 'price', 'is_paid', 'prepay_percent')
+
+
+def aggregate(orders):
+    """Rolls an Order queryset up into unsaved DailySales rows with one GROUP BY query."""
+    paid = Q(is_paid=True)
+    rows = orders.values('date_ordered', 'car__manufacturer', 'car__body_type', 'employee').annotate(
+        n=Count('id'),
+        total=Sum('price'),
+        n_paid=Count('id', filter=paid),
+        paid_total=Sum('price', filter=paid),
+        prepay=Sum('prepay_percent'),
+    ).order_by()
+    return [
+        DailySales(day=r['date_ordered'], manufacturer_id=r['car__manufacturer'], body_type_id=r['car__body_type'],
+                   employee_id=r['employee'], orders=r['n'], revenue=r['total'], paid=r['n_paid'],
+                   paid_revenue=r['paid_total'] or 0, prepay_sum=r['prepay'])
+        for r in rows
+    ]
+
+
+def collect(**filters):
+    """aggregate() over the hot and the archived orders matching the filters, merged per rollup key."""
+    rows = {}
+    for model in (Order, ArchivedOrder):
+        for row in aggregate(model.objects.filter(**filters)):
+            key = tuple(getattr(row, k) for k in KEY)
+            if key not in rows:
+                rows[key] = row
+                continue
+            for m in MEASURES:
+                setattr(rows[key], m, getattr(rows[key], m) + getattr(row, m))
+    return list(rows.values())
+
+
+def refresh(days):
+    """Recomputes the rollup rows of the given days from their orders."""
+    days = sorted(set(days))
+    for i in range(0, len(days), ROLLUP_DAYS_PER_QUERY):
+        chunk = days[i:i + ROLLUP_DAYS_PER_QUERY]
+        with transaction.atomic():
+            DailySales.objects.filter(day__in=chunk).delete()
+            DailySales.objects.bulk_create(collect(date_ordered__in=chunk), batch_size=IMPORT_BATCH_SIZE)
+
+
+def _months(first, last):
+    start = first.replace(day=1)
+    while start <= last:
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        yield start, end
+        start = end
+
+
+def rebuild(progress=None):
+    """
+    Recomputes the whole rollup one month at a time. Each month is swapped in
+    its own transaction, so reports keep reading complete months meanwhile.
+    """
+    first, last = _bounds()
+    if first is None:
+        return
+    for start, end in _months(first, last):
+        rows = collect(date_ordered__gte=start, date_ordered__lt=end)
+        with transaction.atomic():
+            DailySales.objects.filter(day__gte=start, day__lt=end).delete()
+            DailySales.objects.bulk_create(rows, batch_size=IMPORT_BATCH_SIZE)
+        if progress is not None:
+            progress(start, len(rows))
+
+
+def _totals(rows):
+    return {tuple(getattr(r, k) for k in KEY): tuple(getattr(r, m) for m in MEASURES) for r in rows}
+
+
+def _bounds():
+    orders = Order.objects.aggregate(first=Min('date_ordered'), last=Max('date_ordered'))
+    archived = ArchivedOrder.objects.aggregate(first=Min('date_ordered'), last=Max('date_ordered'))
+    rolled = DailySales.objects.aggregate(first=Min('day'), last=Max('day'))
+    days = [d for d in (*orders.values(), *archived.values(), *rolled.values()) if d is not None]
+    return (min(days), max(days)) if days else (None, None)
+
+
+def mismatched_days(since=None, until=None):
+    """Yields the days whose rollup rows differ from a fresh aggregate of their orders, checked a month at a time."""
+    first, last = _bounds()
+    if first is None:
+        return
+    first, last = max(first, since or first), min(last, until or last)
+    for start, end in _months(first, last):
+        start, end = max(start, first), min(end, last + timedelta(days=1))
+        live = _totals(collect(date_ordered__gte=start, date_ordered__lt=end))
+        stored = _totals(DailySales.objects.filter(day__gte=start, day__lt=end))
+        differing = {key for key in live.keys() | stored.keys() if live.get(key) != stored.get(key)}
+        yield from sorted({key[0] for key in differing})
+
+
+def order_state(pk, model=Order):
+    """The values of an order that the rollup depends on, or None if it doesn't exist."""
+    return model.objects.filter(pk=pk).values_list(*STATE).first()
+
+
+def apply(state, sign):
+    """Adds (sign=1) or removes (sign=-1) one order, as returned by order_state(), to its rollup row."""
+    day, manufacturer, body_type, employee, price, is_paid, prepay = state
+    key = dict(day=day, manufacturer_id=manufacturer, body_type_id=body_type, employee_id=employee)
+    delta = dict(orders=1, revenue=price, paid=int(is_paid), paid_revenue=price if is_paid else 0, prepay_sum=prepay)
+    changes = {name: F(name) + sign * value for name, value in delta.items()}
+    rows = DailySales.objects.filter(**key)
+    if rows.update(**changes):
+        if sign < 0:
+            rows.filter(orders__lte=0).delete()
+        return
+    if sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            DailySales.objects.create(**key, **delta)
+    except IntegrityError:
+        rows.update(**changes)
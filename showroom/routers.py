@@ -0,0 +1,84 @@
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = Local()
+
+
+def use_replicas(enabled):
+    _state.replicas = enabled
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def reading_replicas():
+    return bool(getattr(_state, 'replicas', False) and settings.SHOWROOM_READ_REPLICAS)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to one of SHOWROOM_READ_REPLICAS while use_replicas() is on
+    for the current request, and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if reading_replicas():
+            return random.choice(settings.SHOWROOM_READ_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Lets the URL names in SHOWROOM_REPLICA_URLS read from replicas, unless the
+    client wrote within the last SHOWROOM_PRIMARY_STICKY_SECONDS. Writes set a
+    cookie that keeps that client on the primary so it reads its own writes.
+    """
+    cookie = 'showroom_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.reset()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.reset()
+            raise
+        if _state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            window = settings.SHOWROOM_PRIMARY_STICKY_SECONDS
+            response.set_cookie(self.cookie, str(int(time.time() + window)), max_age=window, httponly=True)
+        if response.streaming:
+            # A streamed body is read after we return, it keeps the request's routing until it's closed.
+            response._resource_closers.append(self.reset)
+        else:
+            self.reset()
+        return response
+
+    @staticmethod
+    def reset():
+        use_replicas(False)
+        _state.wrote = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        use_replicas(url_name in settings.SHOWROOM_REPLICA_URLS and not self.sticky(request))
+
+    def sticky(self, request):
+        try:
+            return float(request.COOKIES.get(self.cookie, 0)) > time.time()
+        except ValueError:
+            return False
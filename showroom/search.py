@@ -0,0 +1,113 @@
+import re
+
+from django.db import connection
+
+from showroom.models import Car
+from showroom.utils import SEARCH_RESULTS_MAX, SEARCH_TERMS_MAX
+
+TABLE = 'showroom_carsearch'
+DOCUMENT_FIELDS = ('id', 'brand', 'color', 'specifications', 'manufacturer__name')
+
+_TERM = re.compile(r'\w+')
+
+
+def terms(text):
+    return _TERM.findall(text.lower())[:SEARCH_TERMS_MAX]
+
+
+def document(brand, color, specifications, manufacturer):
+    return ' '.join((brand, color, specifications, manufacturer))
+
+
+def _within(column, cars):
+    """A condition keeping `column` among the ids of a Car queryset, so filters apply before the ranking is cut."""
+    if cars is None:
+        return '', []
+    sql, params = cars.values('id').query.get_compiler(connection=connection).as_sql()
+    return f' AND {column} IN ({sql})', list(params)
+
+
+class SqliteIndex:
+    """FTS5 virtual table keyed by the car id as its rowid."""
+
+    def replace(self, cursor, rows):
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk, _ in rows])
+        cursor.executemany(f'INSERT INTO {TABLE} (rowid, document) VALUES (%s, %s)', rows)
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def match(self, cursor, words, limit, cars=None):
+        query = ' '.join(f'"{w}"*' for w in words)
+        within, params = _within('rowid', cars)
+        cursor.execute(
+            f'SELECT rowid, -bm25({TABLE}) FROM {TABLE} WHERE {TABLE} MATCH %s{within} ORDER BY rank LIMIT %s',
+            [query, *params, limit])
+        return cursor.fetchall()
+
+
+class MysqlIndex:
+    """InnoDB table with a FULLTEXT index on the document column."""
+
+    def replace(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (car_id, document) VALUES (%s, %s) '
+            f'ON DUPLICATE KEY UPDATE document = VALUES(document)', rows)
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE car_id = %s', [(pk,) for pk in ids])
+
+    def match(self, cursor, words, limit, cars=None):
+        query = ' '.join(f'+{w}*' for w in words)
+        within, params = _within('car_id', cars)
+        cursor.execute(
+            f'SELECT car_id, MATCH (document) AGAINST (%s IN BOOLEAN MODE) AS score FROM {TABLE} '
+            f'WHERE MATCH (document) AGAINST (%s IN BOOLEAN MODE){within} ORDER BY score DESC LIMIT %s',
+            [query, query, *params, limit])
+        return cursor.fetchall()
+
+
+INDEXES = {
+    'sqlite': SqliteIndex(),
+    'mysql': MysqlIndex(),
+}
+
+
+def get_index():
+    return INDEXES[connection.vendor]
+
+
+def reindex(cars):
+    """Rewrites the search documents of a Car queryset."""
+    rows = [(pk, document(*values)) for pk, *values in cars.values_list(*DOCUMENT_FIELDS)]
+    if rows:
+        with connection.cursor() as cursor:
+            get_index().replace(cursor, rows)
+
+
+def unindex(ids):
+    with connection.cursor() as cursor:
+        get_index().delete(cursor, ids)
+
+
+def search(text, queryset=None, limit=SEARCH_RESULTS_MAX):
+    """
+    Returns the ids of cars matching every word of `text` by descending relevance.
+    `queryset` narrows the matches with structured filters in the same query,
+    before the `limit` best are kept.
+    """
+    words = terms(text)
+    if not words:
+        return []
+    with connection.cursor() as cursor:
+        return [pk for pk, _ in get_index().match(cursor, words, limit, queryset)]
+
+
+def search_page(text, queryset, page, page_size):
+    """Returns one page of ranked cars and whether there are more."""
+    ids = search(text, queryset)
+    start = (page - 1) * page_size
+    page_ids = ids[start:start + page_size]
+    cars = Car.objects.filter(id__in=page_ids).select_related(
+        'manufacturer', 'body_type').prefetch_related('facilities').in_bulk()
+    return [cars[pk] for pk in page_ids if pk in cars], len(ids) > start + page_size
@@ -0,0 +1,209 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from showroom import availability, changes, rollup, search
+from showroom.api import FEED
+from showroom.backends import forget_user
+from showroom.cache import CACHED_MODELS, bump_generation
+from showroom.models import (
+    ArchivedOrder, BodyType, Car, CarFacility, DailySales, Employee, Fullname, Manufacturer, Order, Position,
+)
+
+# The rows whose feed entries carry fields of another row, with their path to it.
+FEED_DEPENDENTS = {
+    Car: ((Order, 'car'), (ArchivedOrder, 'car')),
+    Fullname: ((Employee, 'fullname'), (Order, 'fullname'), (ArchivedOrder, 'fullname')),
+    Position: ((Employee, 'position'),),
+    Manufacturer: ((Car, 'manufacturer'), (Order, 'car__manufacturer'), (ArchivedOrder, 'car__manufacturer')),
+    BodyType: ((Car, 'body_type'),),
+}
+
+
+def _shown_through(sender, model, path):
+    """The attnames of `sender` that the feed entries of `model` show through `path`."""
+    names = {f[len(path) + 2:].split('__')[0] for f in FEED[changes.NAMES[model]][1] if f.startswith(f'{path}__')}
+    return frozenset(sender._meta.get_field(name).attname for name in names)
+
+
+SHOWN_THROUGH = {
+    sender: [(model, path, _shown_through(sender, model, path)) for model, path in dependents]
+    for sender, dependents in FEED_DEPENDENTS.items()
+}
+
+
+def _pointing_at(model, path, pk):
+    # Nested subqueries rather than joins, so even a two-step path touches its rows in one UPDATE on MySQL.
+    name, _, rest = path.partition('__')
+    if not rest:
+        return model.objects.filter(**{name: pk})
+    related = model._meta.get_field(name).related_model
+    return model.objects.filter(**{f'{name}__in': _pointing_at(related, rest, pk).values('pk')})
+
+
+@receiver([post_save, post_delete])
+def invalidate_catalogue(sender, **kwargs):
+    # Only once committed: bumped earlier, a concurrent read could cache the old rows under the new generation.
+    if sender in CACHED_MODELS:
+        transaction.on_commit(lambda: bump_generation(sender))
+
+
+@receiver(post_save)
+def record_change(sender, instance, **kwargs):
+    changes.record(sender, [instance.pk])
+
+
+@receiver(post_delete)
+def record_deletion(sender, instance, **kwargs):
+    changes.record(sender, [instance.pk], deleted=True)
+
+
+@receiver(pre_save)
+def remember_shown_fields(sender, instance, update_fields=None, **kwargs):
+    if sender not in SHOWN_THROUGH:
+        return
+    fields = frozenset().union(*(fields for _, _, fields in SHOWN_THROUGH[sender]))
+    if update_fields is not None:
+        fields &= {sender._meta.get_field(name).attname for name in update_fields}
+    instance._shown_values = None if instance._state.adding or not fields else (
+        sender.objects.filter(pk=instance.pk).values(*fields).first())
+
+
+@receiver(post_save)
+def record_dependent_changes(sender, instance, created, **kwargs):
+    # A row renamed or repriced changes the feed entries of the rows pointing at it, though none of them is saved.
+    old = getattr(instance, '_shown_values', None)
+    if created or not old:
+        return
+    changed = {name for name, value in old.items() if getattr(instance, name) != value}
+    for model, path, fields in SHOWN_THROUGH[sender]:
+        if changed & fields:
+            changes.touch(model, _pointing_at(model, path, instance.pk))
+
+
+@receiver(m2m_changed, sender=Car.facilities.through)
+def touch_car_facilities(sender, instance, action, reverse, pk_set, **kwargs):
+    # The cars of a facility are only known before it's cleared.
+    if action in ('post_add', 'post_remove', 'pre_clear'):
+        if not reverse:
+            cars = Car.objects.filter(pk=instance.pk)
+        elif action == 'pre_clear':
+            cars = Car.objects.filter(facilities=instance)
+        else:
+            cars = Car.objects.filter(pk__in=pk_set)
+        ids = list(cars.values_list('id', flat=True))
+        Car.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+        changes.record(Car, ids)
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump_generation(CarFacility))
+
+
+@receiver(post_save, sender=Car)
+def index_car(sender, instance, **kwargs):
+    search.reindex(Car.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Car)
+def unindex_car(sender, instance, **kwargs):
+    search.unindex([instance.pk])
+
+
+@receiver(post_save, sender=Manufacturer)
+def index_manufacturer_cars(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex(Car.objects.filter(manufacturer=instance))
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def forget_changed_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    instance._rollup_state = None if instance._state.adding else rollup.order_state(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def roll_up_order(sender, instance, **kwargs):
+    old, new = getattr(instance, '_rollup_state', None), rollup.order_state(instance.pk)
+    if old == new:
+        return
+    if old is not None:
+        rollup.apply(old, -1)
+    rollup.apply(new, 1)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_car(sender, instance, **kwargs):
+    instance._old_car = None if instance._state.adding else (
+        Order.objects.filter(pk=instance.pk).values_list('car', flat=True).first())
+
+
+@receiver(post_save, sender=Order)
+def sync_order_car(sender, instance, **kwargs):
+    availability.sync([instance.car_id, getattr(instance, '_old_car', None)])
+
+
+@receiver(post_delete, sender=Order)
+def sync_deleted_order_car(sender, instance, **kwargs):
+    availability.sync([instance.car_id])
+
+
+@receiver(pre_delete, sender=Order)
+def roll_up_deleted_order(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction, while the car the order is rolled up by still exists.
+    state = rollup.order_state(instance.pk)
+    if state is not None:
+        rollup.apply(state, -1)
+
+
+@receiver(pre_delete, sender=ArchivedOrder)
+def roll_up_deleted_archived_order(sender, instance, **kwargs):
+    state = rollup.order_state(instance.pk, ArchivedOrder)
+    if state is not None:
+        rollup.apply(state, -1)
+
+
+@receiver(pre_save, sender=Car)
+def remember_car_rollup_key(sender, instance, update_fields=None, **kwargs):
+    fields = {'manufacturer', 'manufacturer_id', 'body_type', 'body_type_id'}
+    skip = instance._state.adding or update_fields is not None and not fields & set(update_fields)
+    instance._rollup_key = None if skip else (
+        Car.objects.filter(pk=instance.pk).values_list('manufacturer', 'body_type').first())
+
+
+@receiver(post_save, sender=Car)
+def roll_up_car_orders(sender, instance, **kwargs):
+    # Orders are rolled up by their car's manufacturer and body type, no other change of the car moves them.
+    old = getattr(instance, '_rollup_key', None)
+    if old is not None and old != (instance.manufacturer_id, instance.body_type_id):
+        rollup.refresh([day for model in (Order, ArchivedOrder) for day in model.objects.filter(
+            car=instance).values_list('date_ordered', flat=True).distinct()])
+
+
+@receiver(pre_delete, sender=Employee)
+def record_employee_set_null(sender, instance, **kwargs):
+    # SET_NULL is a plain UPDATE that sends no signals of its own.
+    for model in (Manufacturer, Car, Order, ArchivedOrder):
+        changes.record(model, model.objects.filter(employee=instance).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Employee)
+def remember_employee_days(sender, instance, **kwargs):
+    instance._rollup_days = list(DailySales.objects.filter(employee=instance).values_list('day', flat=True))
+
+
+@receiver(post_delete, sender=Employee)
+def roll_up_employee_days(sender, instance, **kwargs):
+    # SET_NULL leaves the employee's rollup rows next to the no-employee rows of the same key, merge them.
+    rollup.refresh(getattr(instance, '_rollup_days', ()))
@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+import traceback
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from showroom import metrics, querycount
+from showroom.querycount import normalize_sql
+from showroom.utils import SLOW_QUERY_STACK_DEPTH
+
+logger = logging.getLogger(__name__)
+
+_WRAPPERS = {__file__, metrics.__file__, querycount.__file__}
+
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+def explain(connection, sql, params):
+    """
+    Returns the plan rows of a SELECT on backends in EXPLAIN, None otherwise.
+    The plan is read through the DB-API cursor, bypassing execute wrappers,
+    so it doesn't count towards query budgets and metrics.
+    """
+    if connection.vendor not in EXPLAIN or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.cursor.execute(EXPLAIN[connection.vendor] + sql, params)
+            return [list(row) for row in cursor.cursor.fetchall()]
+    except DatabaseError as e:
+        return [[f'EXPLAIN failed: {e}']]
+
+
+def stack_summary():
+    """The innermost project frames that led to the query, outermost first, leaving out execute wrappers."""
+    root = str(settings.BASE_DIR)
+    frames = [f for f in traceback.extract_stack() if f.filename.startswith(root) and f.filename not in _WRAPPERS]
+    return [f'{Path(f.filename).relative_to(root)}:{f.lineno} in {f.name}' for f in frames[-SLOW_QUERY_STACK_DEPTH:]]
+
+
+class SlowQueryLogger:
+    """
+    Execute wrapper that logs every query slower than SHOWROOM_SLOW_QUERY_SECONDS
+    as one JSON line, with its parameters, the view it ran for, where in the
+    code it came from and its EXPLAIN plan.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= settings.SHOWROOM_SLOW_QUERY_SECONDS:
+                self.log(context['connection'], sql, params, many, duration)
+
+    def log(self, connection, sql, params, many, duration):
+        match = getattr(self.request, 'resolver_match', None)
+        logger.warning(json.dumps({
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'duration': round(duration, 6),
+            'database': connection.alias,
+            'view': match.view_name if match else None,
+            'path': getattr(self.request, 'path', None),
+            'sql': sql,
+            'params': None if many else params,
+            'stack': stack_summary(),
+            'explain': None if many else explain(connection, sql, params),
+        }, default=str))
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrapper = SlowQueryLogger(request)
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            return self.get_response(request)
+
+
+def read_log(path):
+    """Yields the JSON records of a log file and its rotated backups, oldest file first."""
+    path = Path(path)
+    backups = [p for p in path.parent.glob(f'{path.name}.*') if p.suffix[1:].isdigit()]
+    backups.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    for file in backups + [path]:
+        if not file.exists():
+            continue
+        with file.open(encoding='utf-8') as stream:
+            for line in stream:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class Shape:
+    def __init__(self, shape):
+        self.shape = shape
+        self.count = 0
+        self.total = 0.0
+        self.slowest = None
+        self.views = set()
+
+    def add(self, record):
+        self.count += 1
+        self.total += record['duration']
+        if record['view']:
+            self.views.add(record['view'])
+        if self.slowest is None or record['duration'] > self.slowest['duration']:
+            self.slowest = record
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+
+def group_by_shape(records):
+    """Groups slow query records by normalized SQL, ranked by total time."""
+    shapes = {}
+    for record in records:
+        key = normalize_sql(record['sql'])
+        shape = shapes.get(key)
+        if shape is None:
+            shape = shapes[key] = Shape(key)
+        shape.add(record)
+    return sorted(shapes.values(), key=lambda s: s.total, reverse=True)
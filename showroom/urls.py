@@ -1,7 +1,7 @@
 from django.urls import path
 from django.contrib.auth.views import LoginView
 
-from showroom import views
+from showroom import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -10,5 +10,13 @@ urlpatterns = [
     path('logout/', views.logout, name='logout'),
     path('employees/', views.employees, name='employees'),
     path('cars/', views.cars, name='cars'),
+    path('cars/search/', views.search, name='search'),
     path('orders/', views.orders, name='orders'),
+    path('reports/sales/', views.sales, name='sales'),
+    path('api/cars/', api.cars, name='api-cars'),
+    path('api/cars/facets/', api.car_facets, name='api-car-facets'),
+    path('api/orders/', api.orders, name='api-orders'),
+    path('api/employees/', api.employees, name='api-employees'),
+    path('api/changes/', api.changes_feed, name='api-changes'),
+    path('api/reprice/', api.reprice, name='api-reprice'),
 ]
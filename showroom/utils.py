@@ -1,3 +1,55 @@
 CHAR_FIELD_DEFAULT_SIZE_S = 20
 CHAR_FIELD_DEFAULT_SIZE_M = 100
-CHAR_FIELD_DEFAULT_SIZE_L = 1000
\ No newline at end of file
+CHAR_FIELD_DEFAULT_SIZE_L = 1000
+
+PAGE_SIZE_DEFAULT = 24
+PAGE_SIZE_MAX = 100
+
+FILTER_PARAMS_MAX = 8
+FILTER_IN_MAX = 100
+# Columns with this many choices or fewer narrow a scan too little to stand in front of an expensive lookup
+FILTER_FEW_CHOICES = 5
+
+CATALOGUE_CACHE_TIMEOUT = 60 * 15
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 0.05
+
+API_CHUNK_SIZE = 2000
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_ERRORS_MAX = 100
+
+SEARCH_RESULTS_MAX = 1000
+SEARCH_TERMS_MAX = 8
+
+PRICE_BRACKETS = (0, 10000, 20000, 30000, 50000, 100000)
+
+USER_CACHE_TIMEOUT = 60
+SESSION_DB_WRITE_INTERVAL = 60 * 5
+
+ADMIN_LIST_PER_PAGE = 50
+ADMIN_EXACT_COUNT_MAX = 10000
+
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SLOW_QUERY_STACK_DEPTH = 6
+
+ROLLUP_DAYS_PER_QUERY = 366
+
+RESERVATION_SECONDS = 60 * 15
+PLACEMENT_RETRIES = 5
+PLACEMENT_BACKOFF = 0.01
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_PAUSE = 0.1
+ARCHIVE_MAX_LAG = 5
+ARCHIVE_HORIZON_TIMEOUT = 60
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_PAGE_SIZE_MAX = 5000
+CHANGES_SETTLE_SECONDS = 5
+CHANGES_TOMBSTONE_DAYS = 30
+
+REPRICE_CHUNK_SIZE = 2000
+REPRICE_DIFFS_MAX = 100
@@ -1,19 +1,22 @@
 import django.contrib.auth as auth
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
-from django.core.exceptions import FieldError, SuspiciousOperation
+from django.core.exceptions import SuspiciousOperation
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.http import require_http_methods
 
+from showroom import archive
+from showroom.cache import catalogue_cache, employee_cache, order_cache
+from showroom.conditional import list_condition
+from showroom.facets import facet_counts, link_facets
+from showroom.filters import CAR_FILTERS, EMPLOYEE_FILTERS, ORDER_FILTERS
 from showroom.forms import SignUpForm
-from showroom.models import Employee, Car, Order
-
-
-def convert_type(val):
-    try:
-        return int(val)
-    except ValueError:
-        return val
+from showroom.models import Car
+from showroom.pagination import is_paginated, paginate, split_params
+from showroom.reports import GROUPINGS, order_totals, rollup_sales_report, sales_report
+from showroom.search import search_page
+from showroom.utils import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
 
 
 @require_http_methods(['GET', 'POST'])
@@ -22,7 +25,7 @@ def signup(request):
         form = SignUpForm(request.POST)
         if form.is_valid():
             user = form.save()
-            auth.login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+            auth.login(request, user, backend='showroom.backends.CachedModelBackend')
             return redirect('index')
     else:
         form = SignUpForm()
@@ -56,32 +59,84 @@ def index(request):
 
 
 @login_required(login_url='/showroom/login/')
+@list_condition(EMPLOYEE_FILTERS, related=('fullname', 'position'), cache=employee_cache)
 def employees(request):
     try:
-        params = {k: convert_type(v) for k, v in request.GET.items()}
-        e = Employee.objects.filter(**params).select_related('fullname', 'position')
-        return render(request, 'employees.html', dict(employees=e))
-    except (FieldError, ValueError):
+        filters, _ = split_params(request.GET)
+        e = EMPLOYEE_FILTERS.filter(filters).select_related('fullname', 'position')
+        page = paginate(request.GET, e, ('id',))
+        return render(request, 'employees.html', dict(employees=e if page is None else page, page=page))
+    except ValueError:
         raise SuspiciousOperation()
 
 
 @login_required(login_url='/showroom/login/')
+@list_condition(CAR_FILTERS, related=('manufacturer',), cache=catalogue_cache)
 def cars(request):
     try:
-        params = {k: convert_type(v) for k, v in request.GET.items()}
+        filters, paging = split_params(request.GET)
+        params = CAR_FILTERS.compile(filters)
         c = Car.objects.filter(**params).select_related(
-            'manufacturer', 'body_type', 'employee', 'facility_1', 'facility_2', 'facility_3')
-        return render(request, 'cars.html', dict(cars=c))
-    except (FieldError, ValueError):
+            'manufacturer', 'body_type', 'employee').prefetch_related('facilities')
+        page = None
+        if is_paginated(request.GET):
+            # Only pages are cached, a whole filtered catalogue could be any size.
+            page = catalogue_cache.get_or_compute((sorted(params.items()), sorted(paging.items())),
+                                                  lambda: paginate(request.GET, c, ('price', 'id')))
+            page.link(request.GET)
+        facets = catalogue_cache.get_or_compute(('facets', sorted(params.items())), lambda: facet_counts(params))
+        return render(request, 'cars.html', dict(cars=c if page is None else page, page=page,
+                                                 facets=link_facets(facets, request.GET)))
+    except ValueError:
         raise SuspiciousOperation()
 
 
 @login_required(login_url='/showroom/login/')
+def search(request):
+    try:
+        filters, paging = split_params(request.GET)
+        text = filters.pop('q', '')
+        number = max(1, int(filters.pop('page', 1)))
+        size = max(1, min(int(paging.get('limit', PAGE_SIZE_DEFAULT)), PAGE_SIZE_MAX))
+        queryset = CAR_FILTERS.filter(filters) if filters else None
+        c, has_next = search_page(text, queryset, number, size)
+    except ValueError:
+        raise SuspiciousOperation()
+    query = request.GET.copy()
+    query['page'] = number + 1
+    next_query = query.urlencode() if has_next else None
+    query['page'] = number - 1
+    previous_query = query.urlencode() if number > 1 else None
+    return render(request, 'search.html', dict(
+        cars=c, q=text, page=dict(next_query=next_query, previous_query=previous_query)))
+
+
+@login_required(login_url='/showroom/login/')
+@list_condition(ORDER_FILTERS, related=('fullname', 'car', 'car__manufacturer', 'employee'), source=archive.orders,
+                cache=order_cache)
 def orders(request):
     try:
-        params = {k: convert_type(v) for k, v in request.GET.items()}
-        o = Order.objects.filter(**params).select_related('fullname', 'car', 'employee')
-        t = sum(order.car.price for order in o)
-        return render(request, 'orders.html', dict(orders=o, total=t))
-    except (FieldError, ValueError):
+        filters, _ = split_params(request.GET)
+        o = archive.orders(ORDER_FILTERS.compile(filters)).select_related('fullname', 'car__manufacturer', 'employee')
+        t = order_totals(o)['total'] or 0
+        page = paginate(request.GET, o, ('date_ordered', 'id'))
+        return render(request, 'orders.html', dict(orders=o if page is None else page, total=t, page=page))
+    except ValueError:
+        raise SuspiciousOperation()
+
+
+@login_required(login_url='/showroom/login/')
+def sales(request):
+    try:
+        filters, _ = split_params(request.GET)
+        group = filters.pop('group', 'month')
+        as_json = filters.pop('format', None) == 'json'
+        kwargs = ORDER_FILTERS.compile(filters)
+        rows = rollup_sales_report(kwargs, group)
+        if rows is None:
+            rows = sales_report(archive.orders(kwargs), group)
+        if as_json:
+            return JsonResponse(dict(group=group, rows=rows))
+        return render(request, 'sales.html', dict(rows=rows, group=group, groupings=GROUPINGS))
+    except ValueError:
         raise SuspiciousOperation()
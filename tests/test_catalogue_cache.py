@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from showroom.dataset import Generator
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class CatalogueCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=10).run()
+        cls.user = User.objects.create_user('clerk', password='wagen-1234')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def car_rows_read(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return any(q['sql'].startswith('SELECT "showroom_car"."id", "showroom_car"."manufacturer_id"')
+                   for q in queries.captured_queries)
+
+    def test_pages_are_cached(self):
+        self.assertTrue(self.car_rows_read('/showroom/cars/?limit=10'))
+        self.assertFalse(self.car_rows_read('/showroom/cars/?limit=10'))
+
+    def test_whole_catalogue_is_not_cached(self):
+        self.assertTrue(self.car_rows_read('/showroom/cars/'))
+        self.assertTrue(self.car_rows_read('/showroom/cars/'))
@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from showroom import changes
+from showroom.dataset import Generator
+from showroom.models import Car, ChangeLog, Employee, Manufacturer, Order, Position
+
+
+class DependentChangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+
+    def recorded(self, model):
+        return set(ChangeLog.objects.filter(id__gt=self.since, model=model).values_list('object_id', flat=True))
+
+    def setUp(self):
+        self.since = changes.latest()
+
+    def test_renamed_manufacturer(self):
+        manufacturer = Manufacturer.objects.filter(car__order__isnull=False).first()
+        manufacturer.name += ' Werke'
+        manufacturer.save()
+        self.assertEqual(self.recorded('car'), set(manufacturer.car_set.values_list('id', flat=True)))
+        orders = Order.objects.filter(car__manufacturer=manufacturer).values_list('id', flat=True)
+        self.assertTrue(orders)
+        self.assertEqual(self.recorded('order'), set(orders))
+        self.assertEqual(self.recorded('manufacturer'), {manufacturer.pk})
+
+    def test_renamed_fullname(self):
+        order = Order.objects.select_related('fullname').first()
+        order.fullname.surname = 'Renamed'
+        order.fullname.save()
+        self.assertIn(order.pk, self.recorded('order'))
+        employees = Employee.objects.filter(fullname=order.fullname_id).values_list('id', flat=True)
+        self.assertEqual(self.recorded('employee'), set(employees))
+
+    def test_renamed_position(self):
+        position = Position.objects.filter(employee__isnull=False).first()
+        position.name += ' senior'
+        position.save()
+        self.assertEqual(self.recorded('employee'), set(position.employee_set.values_list('id', flat=True)))
+        self.assertFalse(self.recorded('car'))
+
+    def test_car_edit_shown_in_orders(self):
+        car = Car.objects.filter(order__isnull=False).first()
+        car.brand = 'Renamed'
+        car.save()
+        self.assertEqual(self.recorded('order'), set(car.order_set.values_list('id', flat=True)))
+        self.since = changes.latest()
+        car.color = 'purple'
+        car.save()
+        self.assertEqual(self.recorded('car'), {car.pk})
+        self.assertFalse(self.recorded('order'))
+
+    def test_fields_the_feed_does_not_show(self):
+        manufacturer = Manufacturer.objects.filter(car__isnull=False).first()
+        manufacturer.address = 'Elsewhere'
+        manufacturer.save()
+        self.assertEqual(self.recorded('manufacturer'), {manufacturer.pk})
+        self.assertFalse(self.recorded('car'))
+        position = Position.objects.filter(employee__isnull=False).first()
+        position.salary += 100
+        position.save()
+        self.assertFalse(self.recorded('employee'))
+
+    def test_touch_records_in_batches(self):
+        cars = Car.objects.all()
+        with CaptureQueriesContext(connection) as queries:
+            changes.touch(Car, cars, batch_size=5)
+        self.assertEqual(self.recorded('car'), set(cars.values_list('id', flat=True)))
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), -(-cars.count() // 5))
+
+    def test_new_lookup_rows_record_nothing_else(self):
+        Position.objects.create(name='Intern', salary=1000, responsibilities='-', requirements='-')
+        self.assertFalse(ChangeLog.objects.filter(id__gt=self.since).exists())
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from showroom import archive
+from showroom.cache import bump_generation
+from showroom.dataset import Generator
+from showroom.models import ArchivedOrder, Fullname, Order
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class OrderValidatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+        archive.run(date.today() + timedelta(days=1), pause=0)
+        cls.user = User.objects.create_user('clerk', password='wagen-1234')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def revalidate(self, path):
+        etag = self.client.get(path)['ETag']
+        return lambda: self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_list_is_not_modified(self):
+        self.assertEqual(self.revalidate('/showroom/orders/')(), 304)
+
+    def test_change_to_an_archived_order(self):
+        archived = ArchivedOrder.objects.exclude(fullname__in=Order.objects.values('fullname')).first()
+        revalidate = self.revalidate('/showroom/orders/')
+        archived.fullname.surname = 'Renamed'
+        archived.fullname.save()
+        # Bumped on commit by the save receivers, which a TestCase never reaches.
+        bump_generation(Fullname)
+        self.assertEqual(revalidate(), 200)
+
+    def validator_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path, HTTP_IF_NONE_MATCH='"stale"')
+        return [q for q in queries.captured_queries if 'MAX(' in q['sql'] and 'updated_at' in q['sql']]
+
+    def test_validator_is_cached_until_a_change(self):
+        for path in ('/showroom/orders/?limit=10', '/showroom/employees/?limit=10'):
+            with self.subTest(path=path):
+                self.assertTrue(self.validator_queries(path))
+                self.assertFalse(self.validator_queries(path))
+                # Bumped on commit by the save receivers, which a TestCase never reaches.
+                bump_generation(Fullname)
+                self.assertTrue(self.validator_queries(path))
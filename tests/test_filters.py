@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from showroom.filters import CAR_FILTERS, RANGE, FilterSchema, InvalidFilter
+from showroom.models import Order
+
+
+class ExpensiveFilterTests(SimpleTestCase):
+    def assert_rejected(self, **params):
+        with self.assertRaisesMessage(InvalidFilter, 'specifications__icontains must be combined'):
+            CAR_FILTERS.compile(dict(specifications__icontains='turbo', **params))
+
+    def test_alone(self):
+        self.assert_rejected()
+
+    def test_half_open_range(self):
+        self.assert_rejected(date_produced__gte='2020-01-01')
+
+    def test_unindexed_column(self):
+        self.assert_rejected(color='red')
+        self.assert_rejected(price__gte='0', price__lte='100000')
+
+    def test_column_with_few_values(self):
+        self.assert_rejected(state='available')
+
+    def test_next_to_another_expensive_lookup(self):
+        self.assert_rejected(brand__icontains='m')
+
+    def test_selective_filters(self):
+        for params in (dict(manufacturer='1'), dict(brand='Model A1'), dict(id__in='1,2,3'),
+                       dict(body_number__in='1,2'), dict(manufacturer__country='DE'), dict(facilities='1')):
+            with self.subTest(params=params):
+                self.assertIn('specifications__icontains', CAR_FILTERS.compile(
+                    dict(specifications__icontains='turbo', **params)))
+
+
+    def test_bounded_range(self):
+        schema = FilterSchema(Order, {'date_ordered': RANGE, 'address': ('icontains',)})
+        for params in (dict(date_ordered__range='2020-01-01,2020-12-31'),
+                       dict(date_ordered__gte='2020-01-01', date_ordered__lt='2021-01-01')):
+            with self.subTest(params=params):
+                schema.compile(dict(address__icontains='road', **params))
+        with self.assertRaises(InvalidFilter):
+            schema.compile(dict(address__icontains='road', date_ordered__gte='2020-01-01'))
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class ExpensiveFilterRequestTests(TestCase):
+    def test_rejected_filters_are_bad_requests(self):
+        self.client.force_login(User.objects.create_user('clerk'))
+        response = self.client.get('/showroom/cars/?specifications__icontains=turbo&price__gte=0')
+        self.assertEqual(response.status_code, 400)
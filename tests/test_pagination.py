@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from showroom.dataset import Generator
+from showroom.models import Car
+from showroom.pagination import KeysetPaginator, encode_cursor
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=30).run()
+        # A run of equal prices, so pages have to break ties on the id.
+        Car.objects.filter(id__in=Car.objects.order_by('id').values_list('id', flat=True)[:12]).update(price=5000)
+        cls.ids = list(Car.objects.order_by('price', 'id').values_list('id', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(Car.objects.all(), ('price', 'id'), page_size=5)
+
+    def test_after_walks_every_row_once(self):
+        ids, cursor = [], None
+        while True:
+            page = self.paginator().page(after=cursor)
+            ids.extend(car.id for car in page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(ids, self.ids)
+
+    def test_before_walks_back(self):
+        page = self.paginator().page()
+        while page.next_cursor:
+            page = self.paginator().page(after=page.next_cursor)
+        ids = []
+        while True:
+            ids[:0] = [car.id for car in page]
+            if page.previous_cursor is None:
+                break
+            page = self.paginator().page(before=page.previous_cursor)
+        self.assertEqual(ids, self.ids)
+
+    def test_ties_continue_after_the_cursor(self):
+        page = self.paginator().page()
+        self.assertEqual([car.id for car in page], self.ids[:5])
+        page = self.paginator().page(after=page.next_cursor)
+        self.assertEqual([car.id for car in page], self.ids[5:10])
+        self.assertEqual({car.price for car in page}, {5000})
+
+    def test_tampered_cursors(self):
+        for cursor in ('not base64 at all!', encode_cursor(['5000']), encode_cursor(['cheap', '1']),
+                       encode_cursor(['5000', 'one'])):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                self.paginator().page(after=cursor)
+
+    def test_after_and_before_together(self):
+        cursor = encode_cursor(['5000', '1'])
+        with self.assertRaises(ValueError):
+            self.paginator().page(after=cursor, before=cursor)
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class CursorRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=10).run()
+        cls.user = User.objects.create_user('clerk', password='wagen-1234')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_bad_cursor_values_are_bad_requests(self):
+        for path in ('/showroom/orders/?after=' + encode_cursor(['notadate', '1']),
+                     '/showroom/cars/?before=' + encode_cursor(['cheap', '1']),
+                     '/showroom/employees/?after=' + encode_cursor(['x'])):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 400)
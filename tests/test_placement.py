@@ -0,0 +1,69 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from showroom import placement
+from showroom.dataset import Generator
+from showroom.models import Car, Employee, Fullname, Order
+
+
+class OrderPlacementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+        cls.fullname = Fullname.objects.first()
+        cls.clerk, cls.other = Employee.objects.values_list('id', flat=True)[:2]
+
+    def setUp(self):
+        self.car = Car.objects.filter(state=Car.AVAILABLE).first()
+
+    def order(self, car, employee=None):
+        return Order(car_id=car.pk, employee_id=employee, fullname=self.fullname, phone=100000000, passport=100000000)
+
+    def test_save_takes_the_car(self):
+        self.order(self.car).save()
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.state, Car.RESERVED)
+        with self.assertRaises(placement.CarUnavailable):
+            self.order(self.car).save()
+        self.assertEqual(Order.objects.filter(car=self.car).count(), 1)
+
+    def test_save_respects_reservations(self):
+        placement.reserve(self.car.pk, self.clerk)
+        with self.assertRaises(placement.CarUnavailable):
+            self.order(self.car, self.other).save()
+        self.order(self.car, self.clerk).save()
+        self.assertEqual(Order.objects.filter(car=self.car).count(), 1)
+
+    def test_moving_an_order_takes_the_new_car(self):
+        order = Order.objects.filter(is_paid=False).exclude(car=self.car).first()
+        sold = Car.objects.filter(state=Car.SOLD).exclude(pk=order.car_id).first()
+        order.car = sold
+        with self.assertRaises(placement.CarUnavailable):
+            order.save()
+        order.car = self.car
+        order.save()
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.state, Car.RESERVED)
+
+    def test_other_edits_leave_the_car_alone(self):
+        order = Order.objects.filter(car__state=Car.SOLD).first()
+        order.address = 'Elsewhere'
+        order.save()
+
+    def test_clean_rejects_a_taken_car(self):
+        sold = Car.objects.filter(state=Car.SOLD).first()
+        with self.assertRaises(ValidationError):
+            self.order(sold).clean()
+        self.order(self.car).clean()
+
+    def test_place_order(self):
+        order = placement.place_order(self.car.pk, self.clerk, fullname=self.fullname, phone=1, passport=1)
+        self.assertEqual(order.car_id, self.car.pk)
+        with self.assertRaises(placement.CarUnavailable):
+            placement.place_order(self.car.pk, self.clerk, fullname=self.fullname, phone=1, passport=1)
+
+    def test_reservation_needs_an_employee(self):
+        with self.assertRaises(ValueError):
+            placement.reserve(self.car.pk, None)
+        self.car.refresh_from_db()
+        self.assertIsNone(self.car.reserved_until)
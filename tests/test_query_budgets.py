@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from showroom.dataset import Generator
+from showroom.models import Car, Employee, Order
+from showroom.querycount import assert_query_budget
+
+
+@override_settings(SHOWROOM_READ_REPLICAS=[])
+class QueryBudgetTests(TestCase):
+    """
+    Each page stays within its SHOWROOM_QUERY_BUDGETS entry on a cold cache,
+    with several times more rows than SHOWROOM_N_PLUS_ONE_THRESHOLD on it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+        cls.user = User.objects.create_user('clerk', password='wagen-1234')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assert_budget(self, name, path):
+        with assert_query_budget(settings.SHOWROOM_QUERY_BUDGETS[name]):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_cars(self):
+        response = self.assert_budget('cars', '/showroom/cars/')
+        self.assertContains(response, Car.objects.order_by('id').first().brand)
+
+    def test_cars_filtered_and_paged(self):
+        self.assert_budget('cars', '/showroom/cars/?state=available&facilities=1&limit=10')
+
+    def test_orders(self):
+        response = self.assert_budget('orders', '/showroom/orders/')
+        self.assertContains(response, Order.objects.order_by('id').first().car.manufacturer.name)
+
+    def test_orders_paged(self):
+        self.assert_budget('orders', '/showroom/orders/?is_paid=1&limit=20')
+
+    def test_employees(self):
+        response = self.assert_budget('employees', '/showroom/employees/')
+        self.assertContains(response, Employee.objects.order_by('id').first().fullname.surname)
+
+    def test_sales(self):
+        self.assert_budget('sales', '/showroom/reports/sales/')
+
+    def test_search(self):
+        self.assert_budget('search', '/showroom/cars/search/?q=turbo')
+
+    def test_detects_repeated_queries(self):
+        with self.assertRaisesMessage(AssertionError, 'Repeated queries detected'):
+            with assert_query_budget(100):
+                [str(order) for order in Order.objects.all()[:10]]
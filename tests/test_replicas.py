@@ -0,0 +1,83 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from showroom.cache import bump_generation
+from showroom.dataset import Generator
+from showroom.models import Car
+from showroom.routers import ReplicaMiddleware
+
+
+class ReplicaRoutingTests(TestCase):
+    """The replica test database is left empty, so what a page shows tells which database it read."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=30).run()
+        cls.user = User.objects.create_user('clerk', password='wagen-1234')
+        # Replicated by hand, the login itself must resolve on either database.
+        cls.user.save(using='replica')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, path):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(path)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content, replica
+
+    def test_list_reads_replica(self):
+        response, content, replica = self.get('/showroom/cars/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertNotContains(response, Car.objects.first().brand)
+
+    def test_streamed_api_reads_replica(self):
+        response, content, replica = self.get('/showroom/api/cars/?format=json')
+        self.assertTrue(any('showroom_car' in q['sql'] for q in replica.captured_queries))
+        self.assertEqual(json.loads(content), [])
+
+    def test_write_sticks_to_primary(self):
+        response = self.client.post('/showroom/login/', {'username': 'clerk', 'password': 'wagen-1234'})
+        self.assertIn(ReplicaMiddleware.cookie, response.cookies)
+
+        response, content, replica = self.get('/showroom/cars/')
+        self.assertFalse(replica.captured_queries)
+        self.assertContains(response, Car.objects.first().brand)
+
+    def test_warm_cache_keeps_writers_on_their_writes(self):
+        self.get('/showroom/cars/?limit=10')
+        self.client.cookies[ReplicaMiddleware.cookie] = str(int(time.time() + 60))
+        response, content, replica = self.get('/showroom/cars/?limit=10')
+        self.assertFalse(replica.captured_queries)
+        self.assertContains(response, Car.objects.order_by('price', 'id').first().brand)
+
+    def test_replica_reads_are_cached(self):
+        self.get('/showroom/cars/?limit=10')
+        response, content, replica = self.get('/showroom/cars/?limit=10')
+        self.assertFalse(any('showroom_car' in q['sql'] for q in replica.captured_queries))
+
+    def test_replica_reads_are_not_cached_right_after_a_change(self):
+        bump_generation(Car)
+        self.get('/showroom/cars/?limit=10')
+        response, content, replica = self.get('/showroom/cars/?limit=10')
+        self.assertTrue(any('showroom_car' in q['sql'] for q in replica.captured_queries))
+
+    def test_sticky_window_ends(self):
+        self.client.cookies[ReplicaMiddleware.cookie] = str(int(time.time() - 1))
+        response, content, replica = self.get('/showroom/cars/')
+        self.assertTrue(replica.captured_queries)
+
+    def test_writes_go_to_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.post('/showroom/login/', {'username': 'clerk', 'password': 'wagen-1234'})
+        self.assertFalse(any(q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) for q in replica.captured_queries))
@@ -0,0 +1,24 @@
+from django.test import TestCase
+
+from showroom import archive, rollup
+from showroom.dataset import Generator
+from showroom.models import Manufacturer, Order
+from showroom.reports import GROUPINGS, rollup_sales_report, sales_report
+
+
+class SalesReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+        # Only one manufacturer's orders are paid, so the others have nothing paid and it has nothing unpaid.
+        manufacturer = Manufacturer.objects.filter(car__order__isnull=False).first()
+        Order.objects.update(is_paid=False)
+        Order.objects.filter(car__manufacturer=manufacturer).update(is_paid=True)
+        rollup.rebuild()
+
+    def test_live_and_rollup_reports_match(self):
+        for group in GROUPINGS:
+            with self.subTest(group=group):
+                live = sales_report(archive.orders({}), group)
+                self.assertEqual(live, rollup_sales_report({}, group))
+                self.assertNotIn(None, [row[name] for row in live for name in ('paid_total', 'unpaid_total')])
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from showroom import changes, repricing
+from showroom.dataset import Generator
+from showroom.models import Car, ChangeLog, Order
+
+
+class RepricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=10).run()
+
+    def setUp(self):
+        self.car = Car.objects.filter(order__isnull=False).order_by('id').first()
+        Car.objects.filter(pk=self.car.pk).update(price=Decimal('49492.00'))
+
+    def reprice(self, dry_run=False, **op):
+        rules = repricing.parse([dict(where={'id': self.car.pk}, **op)])
+        return repricing.run(rules, dry_run=dry_run)
+
+    def price(self):
+        return Car.objects.values_list('price', flat=True).get(pk=self.car.pk)
+
+    def test_fractional_percent(self):
+        report = self.reprice(percent=7.5)
+        self.assertEqual(self.price(), Decimal('53203.90'))
+        self.assertEqual(report.diffs, [('car', self.car.pk, Decimal('49492.00'), Decimal('53203.90'))])
+
+    def test_records_the_orders_of_repriced_cars(self):
+        since = changes.latest()
+        self.reprice(percent=5)
+        recorded = ChangeLog.objects.filter(id__gt=since, model='order').values_list('object_id', flat=True)
+        self.assertEqual(set(recorded), set(Order.objects.filter(car=self.car).values_list('id', flat=True)))
+
+    def test_fractional_discount(self):
+        self.reprice(percent=-12.25)
+        self.assertEqual(self.price(), Decimal('43429.23'))
+
+    def test_dry_run_changes_nothing(self):
+        report = self.reprice(dry_run=True, percent=7.5)
+        self.assertEqual(self.price(), Decimal('49492.00'))
+        self.assertEqual(report.summary(10)['diffs'][0]['new'], Decimal('53203.90'))
@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from showroom import rollup
+from showroom.dataset import Generator
+from showroom.models import BodyType, Car, Order
+from showroom.querycount import record_queries
+
+
+class CarRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+
+    def setUp(self):
+        self.car = Car.objects.filter(id__in=Order.objects.values('car')).first()
+
+    def test_other_changes_leave_the_rollup_alone(self):
+        self.car.color = 'purple'
+        self.car.price += 100
+        with record_queries() as recorder:
+            self.car.save()
+        self.assertFalse([sql for _, sql, _ in recorder.queries if 'showroom_dailysales' in sql])
+
+    def test_body_type_change_moves_the_orders(self):
+        self.car.body_type = BodyType.objects.exclude(id=self.car.body_type_id).first()
+        self.car.save()
+        self.assertEqual(list(rollup.mismatched_days()), [])
@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from showroom.dataset import Generator
+from showroom.models import Car
+from showroom.search import search
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Generator(orders=60).run()
+
+    def test_matches_the_cars_with_the_word(self):
+        ids = search('turbo')
+        turbo = Car.objects.filter(specifications__icontains='turbo')
+        self.assertTrue(ids)
+        self.assertEqual(set(ids), set(turbo.values_list('id', flat=True)))
+
+    def test_filters_apply_before_the_limit(self):
+        ranked = search('turbo')
+        last = ranked[-1]
+        self.assertNotIn(last, search('turbo', limit=5))
+        self.assertEqual(search('turbo', Car.objects.filter(id=last), limit=5), [last])
+
+    def test_filters_with_joins(self):
+        car = Car.objects.filter(specifications__icontains='turbo').select_related('manufacturer').first()
+        queryset = Car.objects.filter(manufacturer__country=car.manufacturer.country)
+        ids = search('turbo', queryset)
+        self.assertIn(car.id, ids)
+        turbo = queryset.filter(specifications__icontains='turbo')
+        self.assertEqual(set(ids), set(turbo.values_list('id', flat=True)))
@@ -0,0 +1,36 @@
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from showroom.sessions import SessionStore
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        self.session = SessionStore()
+        self.session['cart'] = [1, 2]
+        self.session.save()
+
+    def save_later(self, session, seconds):
+        with mock.patch('time.time', return_value=time.time() + seconds):
+            with CaptureQueriesContext(connection) as queries:
+                session.save()
+        return [q['sql'] for q in queries.captured_queries if 'django_session' in q['sql']]
+
+    def test_unchanged_session_skips_the_database(self):
+        session = SessionStore(self.session.session_key)
+        self.assertEqual(session['cart'], [1, 2])
+        self.assertEqual(self.save_later(session, 2), [])
+
+    def test_changed_session_is_written(self):
+        session = SessionStore(self.session.session_key)
+        session['cart'] = [1, 2, 3]
+        self.assertTrue(self.save_later(session, 2))
+
+    def test_unchanged_session_is_written_after_the_interval(self):
+        session = SessionStore(self.session.session_key)
+        session['cart']
+        self.assertTrue(self.save_later(session, 60 * 60))